@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+
+from algorithm.evaluation import episode_seed, run_episodes
+
+import random
+
+class StateBank:
+    """Scores genomes on a fresh episode plus a few hard states harvested from earlier generations"""
+
+    def __init__(self, capacity: int = 500, states: int = 4, weight: float = 1.0, seed: int = None, runner=None):
+        self.capacity = capacity
+        self.states = states
+        self.weight = weight
+        self.seed = seed
+        self.runner = runner or run_episodes
+        self.random = random.Random(seed)
+        self.bank = []
+        self.offered = 0
+        self.generation = 0
+
+    def offer(self, state: bytes):
+        """Keep a harvested state, every state offered so far is equally likely to be in the bank"""
+        self.offered += 1
+        if len(self.bank) < self.capacity:
+            self.bank.append(state)
+            return
+        slot = self.random.randrange(self.offered)
+        if slot < self.capacity:
+            self.bank[slot] = state
+
+    def sample(self) -> list[bytes]:
+        """States every genome of this generation plays from"""
+        return self.random.sample(self.bank, min(self.states, len(self.bank)))
+
+    def evaluate(self, genomes, config):
+        """Score the genomes of a generation, usable as a NEAT fitness function"""
+        genomes = dict(genomes)
+
+        # States are drawn before harvesting so a genome never plays a state it just produced
+        states = self.sample()
+
+        episodes = [(genome_id, genome, episode_seed(self.seed, genome_id)) for genome_id, genome in genomes.items()]
+        harvested = []
+        for genome_id, fitness, stats in self.runner(episodes, config, harvest=True):
+            genomes[genome_id].fitness = fitness
+            if stats.get("hard") is not None:
+                harvested.append(stats["hard"])
+
+        # Every genome plays the same states so the gains are comparable
+        if states:
+            episodes = [(genome_id, genome, None, state) for genome_id, genome in genomes.items() for state in states]
+            gains = {genome_id: 0.0 for genome_id in genomes}
+            for genome_id, fitness, _ in self.runner(episodes, config):
+                gains[genome_id] += fitness
+            for genome_id, genome in genomes.items():
+                genome.fitness += self.weight * gains[genome_id] / len(states)
+
+        for state in harvested:
+            self.offer(state)
+        print(f"State bank: {len(self.bank)} states, {len(harvested)} harvested, {len(states)} played per genome")
+        self.generation += 1
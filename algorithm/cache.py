@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+
+from algorithm.evaluation import episode_seed
+
+from collections import OrderedDict
+import hashlib
+import neat
+
+def genome_fingerprint(genome) -> bytes:
+    """Digest of everything that shapes a genome's network, its key is left out"""
+    nodes = sorted((key, node.bias, node.response, node.activation, node.aggregation)
+                   for key, node in genome.nodes.items())
+    connections = sorted((key, connection.weight)
+                         for key, connection in genome.connections.items() if connection.enabled)
+    return hashlib.blake2b(repr((nodes, connections)).encode(), digest_size=16).digest()
+
+class FitnessCache(neat.reporting.BaseReporter):
+    """Bounded LRU cache of genome fitness, reports its hits and misses every generation"""
+
+    def __init__(self, max_size: int = 10000):
+        self.max_size = max_size
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        """Cached fitness of a key, or None"""
+        fitness = self.entries.get(key)
+        if fitness is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        self.entries.move_to_end(key)
+        return fitness
+
+    def put(self, key, fitness):
+        """Store a fitness, evicting the least recently used entry when full"""
+        self.entries[key] = fitness
+        self.entries.move_to_end(key)
+        if len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+
+    def cached(self, fitness_function, seed: int = None):
+        """Wrap a NEAT fitness function so only genomes missing from the cache are evaluated"""
+        # Without a seed episodes are random, a cached fitness would be one lucky or unlucky sample reused forever
+        if seed is None:
+            return fitness_function
+
+        def evaluate(genomes, config):
+            missing = []
+            keys = {}
+
+            for genome_id, genome in genomes:
+                key = (genome_fingerprint(genome), episode_seed(seed, genome_id))
+                fitness = self.get(key)
+                if fitness is None:
+                    missing.append((genome_id, genome))
+                    keys[genome_id] = key
+                else:
+                    genome.fitness = fitness
+
+            if missing:
+                fitness_function(missing, config)
+            for genome_id, genome in missing:
+                self.put(keys[genome_id], genome.fitness)
+
+        return evaluate
+
+    def start_generation(self, generation):
+        self.hits = 0
+        self.misses = 0
+
+    def post_evaluate(self, config, population, species, best_genome):
+        total = self.hits + self.misses
+        rate = 100.0 * self.hits / total if total else 0.0
+        print(f"Fitness cache: {self.hits} hits, {self.misses} misses ({rate:.1f}%), {len(self.entries)} entries")
@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+
+from itertools import count
+import threading
+import logging
+import pickle
+import random
+import queue
+import gzip
+import neat
+import os
+import re
+
+logger = logging.getLogger(__name__)
+
+# Full checkpoints hold every genome, the others only the genomes new since the previous checkpoint
+FILENAME = re.compile(r"checkpoint_(\d+)(_full)?\.pkl\.gz$")
+
+def checkpoint_path(folder: str, generation: int, full: bool) -> str:
+    return os.path.join(folder, f"checkpoint_{generation:06d}{'_full' if full else ''}.pkl.gz")
+
+def checkpoint_files(folder: str) -> dict[int, bool]:
+    """Generations with a checkpoint in the folder mapped to whether it is full, oldest first"""
+    if not os.path.isdir(folder):
+        return {}
+    matches = [FILENAME.match(name) for name in os.listdir(folder)]
+    return dict(sorted((int(match.group(1)), bool(match.group(2))) for match in matches if match))
+
+def peek_index(indexer) -> tuple[int, object]:
+    """Next value of an itertools.count, returned with a fresh counter starting at it"""
+    value = next(indexer)
+    return value, count(value)
+
+class Checkpointer(neat.reporting.BaseReporter):
+    """Writes compressed checkpoints on a background thread, each holding only the genomes new since the last one"""
+
+    def __init__(self, population: neat.Population, folder: str, interval: int = 1, full_every: int = 10,
+                 keep: int = 2, compresslevel: int = 6):
+        if not os.path.exists(folder):
+            os.makedirs(folder)
+        self.population = population
+        self.folder = folder
+        self.interval = interval
+        self.full_every = full_every
+        self.keep = keep
+        self.compresslevel = compresslevel
+
+        # Generations of the checkpoints since the last full one and the genome keys they hold
+        self.chain = []
+        self.written = set()
+
+        self.pending = queue.Queue()
+        self.writer = threading.Thread(target=self.write_loop, daemon=True)
+        self.writer.start()
+
+    def end_generation(self, config, population, species_set):
+        # The population is already the next generation's, so that is the generation a resume starts at
+        generation = self.population.generation + 1
+        if generation % self.interval != 0:
+            return
+        self.pending.put(self.snapshot(generation, population, species_set))
+
+    def snapshot(self, generation: int, population: dict, species_set) -> dict:
+        """Everything needed to resume, cheap enough to take between generations"""
+        full = len(self.chain) % self.full_every == 0
+        if full:
+            self.chain = []
+            self.written = set()
+
+        # Genomes are never changed once created, only their fitness, which is copied here
+        genomes = {key: genome for key, genome in population.items() if key not in self.written}
+        self.written.update(genomes)
+        self.chain.append(generation)
+
+        species = {}
+        for key, s in species_set.species.items():
+            species[key] = {
+                "created": s.created,
+                "last_improved": s.last_improved,
+                "representative": s.representative.key,
+                "members": list(s.members),
+                "fitness": s.fitness,
+                "adjusted_fitness": s.adjusted_fitness,
+                "fitness_history": list(s.fitness_history),
+            }
+            if s.representative.key not in population:
+                genomes[s.representative.key] = s.representative
+
+        reproduction = self.population.reproduction
+        genome_index, reproduction.genome_indexer = peek_index(reproduction.genome_indexer)
+        species_index, species_set.indexer = peek_index(species_set.indexer)
+        genome_config = self.population.config.genome_config
+        node_index = None
+        if genome_config.node_indexer is not None:
+            node_index, genome_config.node_indexer = peek_index(genome_config.node_indexer)
+
+        reporters = {}
+        for reporter in self.population.reporters.reporters:
+            if hasattr(reporter, "checkpoint_state"):
+                reporters[type(reporter).__name__] = reporter.checkpoint_state()
+
+        return {
+            "generation": generation,
+            "chain": list(self.chain),
+            "full": full,
+            "genomes": genomes,
+            "population": {key: genome.fitness for key, genome in population.items()},
+            "species": species,
+            "ancestors": {key: reproduction.ancestors.get(key, ()) for key in population},
+            "genome_index": genome_index,
+            "species_index": species_index,
+            "node_index": node_index,
+            "random": random.getstate(),
+            "reporters": reporters,
+        }
+
+    def write_loop(self):
+        """Write the queued checkpoints one at a time"""
+        while True:
+            state = self.pending.get()
+            try:
+                self.write(state)
+            except Exception:
+                logger.exception("checkpoint of generation %s failed", state["generation"])
+            finally:
+                self.pending.task_done()
+
+    def write(self, state: dict):
+        """Write a checkpoint atomically, then drop the chains that are no longer kept"""
+        path = checkpoint_path(self.folder, state["generation"], state["full"])
+        temporary = path + ".tmp"
+        with gzip.open(temporary, "wb", compresslevel=self.compresslevel) as f:
+            pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temporary, path)
+
+        if state["full"]:
+            self.evict()
+
+    def evict(self):
+        """Remove the checkpoints older than the oldest full checkpoint kept"""
+        files = checkpoint_files(self.folder)
+        fulls = [generation for generation, full in files.items() if full]
+        if len(fulls) <= self.keep:
+            return
+        oldest = fulls[-self.keep]
+        for generation, full in files.items():
+            if generation < oldest:
+                os.remove(checkpoint_path(self.folder, generation, full))
+
+    def flush(self):
+        """Wait until every queued checkpoint is on disk"""
+        self.pending.join()
+
+def load_state(folder: str, generation: int) -> dict:
+    full = checkpoint_files(folder)[generation]
+    with gzip.open(checkpoint_path(folder, generation, full), "rb") as f:
+        return pickle.load(f)
+
+def latest_checkpoint(folder: str):
+    """Generation of the newest checkpoint in the folder, None if there is none"""
+    generations = list(checkpoint_files(folder))
+    return generations[-1] if generations else None
+
+def restore_checkpoint(folder: str, config, generation: int = None) -> tuple[neat.Population, dict]:
+    """Rebuild the population of a checkpoint, the latest by default, returns it and the saved reporter states"""
+    if generation is None:
+        generation = latest_checkpoint(folder)
+        if generation is None:
+            raise FileNotFoundError(f"No checkpoints in {folder}")
+
+    state = load_state(folder, generation)
+    genomes = {}
+    for link in state["chain"][:-1]:
+        genomes.update(load_state(folder, link)["genomes"])
+    genomes.update(state["genomes"])
+
+    population = {}
+    for key, fitness in state["population"].items():
+        genome = genomes[key]
+        genome.fitness = fitness
+        population[key] = genome
+
+    p = neat.Population(config, (population, None, state["generation"]))
+    species_set = config.species_set_type(config.species_set_config, p.reporters)
+    for key, saved in state["species"].items():
+        s = neat.species.Species(key, saved["created"])
+        s.last_improved = saved["last_improved"]
+        s.update(genomes[saved["representative"]], {member: population[member] for member in saved["members"]})
+        s.fitness = saved["fitness"]
+        s.adjusted_fitness = saved["adjusted_fitness"]
+        s.fitness_history = saved["fitness_history"]
+        species_set.species[key] = s
+        for member in saved["members"]:
+            species_set.genome_to_species[member] = key
+    p.species = species_set
+
+    # Counters continue where they stopped so new genomes, species and nodes never reuse a key
+    p.reproduction.genome_indexer = count(state["genome_index"])
+    p.reproduction.ancestors = dict(state["ancestors"])
+    species_set.indexer = count(state["species_index"])
+    if state["node_index"] is not None:
+        config.genome_config.node_indexer = count(state["node_index"])
+    random.setstate(state["random"])
+    return p, state["reporters"]
+
+def restore_reporters(population: neat.Population, states: dict):
+    """Give the reporters of a resumed population their saved state"""
+    for reporter in population.reporters.reporters:
+        state = states.get(type(reporter).__name__)
+        if state is not None and hasattr(reporter, "restore_state"):
+            reporter.restore_state(state)
@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+
+from neat.graphs import feed_forward_layers
+
+import numpy as np
+
+# Vectorized versions of the neat activation functions, others fall back to np.vectorize
+ACTIVATIONS = {
+    "sigmoid": lambda z: 1.0 / (1.0 + np.exp(-np.clip(5.0 * z, -60.0, 60.0))),
+    "tanh": lambda z: np.tanh(np.clip(2.5 * z, -60.0, 60.0)),
+    "relu": lambda z: np.where(z > 0.0, z, 0.0),
+    "identity": lambda z: z,
+    "clamped": lambda z: np.clip(z, -1.0, 1.0),
+    "abs": np.abs,
+    "square": np.square,
+}
+
+def aggregate(name: str, x, mask):
+    """Aggregate the weighted inputs x of shape (batch, nodes, inputs), mask marks the real inputs"""
+    if name == "sum":
+        # Padded inputs have a weight of 0
+        return x.sum(axis=2)
+    elif name == "product":
+        return np.where(mask, x, 1.0).prod(axis=2)
+    elif name == "max":
+        return np.where(mask, x, -np.inf).max(axis=2)
+    elif name == "min":
+        return np.where(mask, x, np.inf).min(axis=2)
+    elif name == "mean":
+        return np.where(mask, x, 0.0).sum(axis=2) / mask.sum(axis=1)
+    elif name == "median":
+        # Matches neat's median2, the mean of the middle pair for an even count
+        x = np.sort(np.where(mask, x, np.inf), axis=2)
+        count = mask.sum(axis=1)
+        lower = np.take_along_axis(x, np.broadcast_to(((count - 1) // 2)[None, :, None], x.shape[:2] + (1,)), axis=2)
+        upper = np.take_along_axis(x, np.broadcast_to((count // 2)[None, :, None], x.shape[:2] + (1,)), axis=2)
+        return ((lower + upper) / 2.0)[..., 0]
+    elif name == "maxabs":
+        x = np.where(mask, x, 0.0)
+        index = np.abs(x).argmax(axis=2)
+        return np.take_along_axis(x, index[..., None], axis=2)[..., 0]
+    return None
+
+class NodeGroup:
+    """Nodes of the same layer sharing an aggregation"""
+
+    def __init__(self, aggregation: str):
+        self.aggregation = aggregation
+        self.activations = []
+        self.nodes = []
+        self.inputs = []
+        self.weights = []
+        self.bias = []
+        self.response = []
+
+    def add(self, slot: int, inputs: list[tuple[int, float]], activation: str, bias: float, response: float):
+        """Add a node and its weighted input slots"""
+        self.nodes.append(slot)
+        self.activations.append(activation)
+        self.inputs.append([source for source, _ in inputs])
+        self.weights.append([weight for _, weight in inputs])
+        self.bias.append(bias)
+        self.response.append(response)
+
+    def pack(self):
+        """Pad the inputs of every node into arrays"""
+        degree = max(len(inputs) for inputs in self.inputs)
+        count = len(self.nodes)
+
+        self.mask = np.zeros((count, degree), dtype=bool)
+        sources = np.zeros((count, degree), dtype=np.int64)
+        weights = np.zeros((count, degree))
+        for i, (inputs, node_weights) in enumerate(zip(self.inputs, self.weights)):
+            self.mask[i, :len(inputs)] = True
+            sources[i, :len(inputs)] = inputs
+            weights[i, :len(inputs)] = node_weights
+
+        self.nodes = np.array(self.nodes, dtype=np.int64)
+        self.inputs = sources
+        self.weights = weights
+        self.bias = np.array(self.bias)
+        self.response = np.array(self.response)
+
+        # Positions of the nodes using each activation
+        names = self.activations
+        self.activations = {name: np.array([i for i, node in enumerate(names) if node == name]) for name in set(names)}
+
+class CompiledNetwork:
+    """Layered NumPy evaluator for the feed forward networks of one or more genomes"""
+
+    def __init__(self, genomes, config):
+        genome_config = config.genome_config
+        self.genome_config = genome_config
+        self.count = len(genomes)
+        self.num_inputs = len(genome_config.input_keys)
+        self.num_outputs = len(genome_config.output_keys)
+
+        # Slots hold every genome's inputs, then every genome's outputs, then hidden nodes
+        self.output_start = self.count * self.num_inputs
+        self.slots = self.output_start + self.count * self.num_outputs
+        groups = {}
+
+        for g, genome in enumerate(genomes):
+            slots = {key: g * self.num_inputs + i for i, key in enumerate(genome_config.input_keys)}
+            for i, key in enumerate(genome_config.output_keys):
+                slots[key] = self.output_start + g * self.num_outputs + i
+
+            # Disabled connections are dropped and nodes that cannot reach an output are pruned
+            connections = [cg.key for cg in genome.connections.values() if cg.enabled]
+            layers = feed_forward_layers(genome_config.input_keys, genome_config.output_keys, connections)
+            incoming = {}
+            for i, o in connections:
+                incoming.setdefault(o, []).append((i, genome.connections[(i, o)].weight))
+
+            for depth, layer in enumerate(layers):
+                for node in layer:
+                    if node not in slots:
+                        slots[node] = self.slots
+                        self.slots += 1
+
+                for node in layer:
+                    inputs = [(slots[i], weight) for i, weight in incoming[node]]
+                    ng = genome.nodes[node]
+                    key = (depth, ng.aggregation)
+                    if key not in groups:
+                        groups[key] = NodeGroup(ng.aggregation)
+                    groups[key].add(slots[node], inputs, ng.activation, ng.bias, ng.response)
+
+        # Layers of different genomes with the same depth are evaluated together
+        self.groups = [groups[key] for key in sorted(groups, key=lambda key: key[0])]
+        for group in self.groups:
+            group.pack()
+
+    @staticmethod
+    def create(genome, config):
+        """Compile the network of a single genome"""
+        return CompiledNetwork([genome], config)
+
+    def activate_batch(self, inputs):
+        """Activate every genome's network, inputs has shape ([batch,] genomes, num_inputs)"""
+        inputs = np.asarray(inputs, dtype=np.float64)
+        batched = inputs.ndim == 3
+        if not batched:
+            inputs = inputs[None]
+        batch = inputs.shape[0]
+
+        values = np.zeros((batch, self.slots))
+        values[:, :self.output_start] = inputs.reshape(batch, -1)
+
+        for group in self.groups:
+            x = values[:, group.inputs] * group.weights
+            aggregated = aggregate(group.aggregation, x, group.mask)
+            if aggregated is None:
+                aggregated = self.fallback_aggregate(group, x)
+
+            z = group.bias + group.response * aggregated
+            if len(group.activations) == 1:
+                name, = group.activations
+                values[:, group.nodes] = self.activation(name)(z)
+            else:
+                for name, nodes in group.activations.items():
+                    values[:, group.nodes[nodes]] = self.activation(name)(z[:, nodes])
+
+        outputs = values[:, self.output_start:self.output_start + self.count * self.num_outputs]
+        outputs = outputs.reshape(batch, self.count, self.num_outputs)
+        return outputs if batched else outputs[0]
+
+    def activation(self, name: str):
+        """Vectorized activation function, wrapping the neat function if there is no NumPy version"""
+        activation = ACTIVATIONS.get(name)
+        if activation is None:
+            activation = np.vectorize(self.genome_config.activation_defs.get(name), otypes=[float])
+        return activation
+
+    def fallback_aggregate(self, group, x):
+        """Aggregate with the neat function itself for aggregations without a vectorized version"""
+        function = self.genome_config.aggregation_function_defs.get(group.aggregation)
+        result = np.zeros(x.shape[:2])
+        for b in range(x.shape[0]):
+            for i, mask in enumerate(group.mask):
+                result[b, i] = function(x[b, i, mask].tolist())
+        return result
+
+    def activate(self, inputs):
+        """Activate the first genome's network on a single input list, like neat's FeedForwardNetwork"""
+        return self.activate_batch(np.asarray(inputs, dtype=np.float64)[None])[0].tolist()
@@ -0,0 +1,316 @@
+#!/usr/bin/env python3
+
+from game.batch import OUTPUT_HEADINGS, BatchSimulation
+from game.display import get_screen
+from game.sensors import sensor_blocks
+from game.simulation import Simulation
+from components.entity import Entity
+from components.utils import Direction
+from algorithm.compiled import CompiledNetwork
+from algorithm.profiler import PhaseProfiler
+from algorithm.recording import EpisodeRecord
+
+from collections import deque
+import numpy as np
+import neat
+import math
+
+WIDTH, HEIGHT = 420, 420
+
+# Snapshots for the state bank are taken every few moves once the snake is long enough
+HARVEST_INTERVAL = 5
+HARVEST_LENGTH = 2
+
+def episode_seed(seed: int, genome_id: int):
+    """Seed of the episode a genome is evaluated on, None keeps it random"""
+    if seed is None:
+        return None
+    return seed * 1000003 + genome_id
+
+def create_batch(seeds: list, blocks: tuple[str, ...] = ("rays",)) -> BatchSimulation:
+    """Create a batch of the headless games genomes are trained on, one per seed"""
+    return BatchSimulation(len(seeds), WIDTH, HEIGHT, Entity(200, 200, 20, (0, 255, 0)), seeds, blocks)
+
+def create_game(seed: int = None, blocks: tuple[str, ...] = ("rays",)) -> Simulation:
+    """Create the headless game genomes are trained on"""
+    return Simulation(WIDTH, HEIGHT, Entity(200, 200, 20, (0, 255, 0)), (255, 255, 255), seed=seed, blocks=blocks)
+
+def config_blocks(config) -> tuple[str, ...]:
+    """Sensor blocks feeding the networks of a config"""
+    return sensor_blocks(config.genome_config.num_inputs)
+
+def output_direction(output) -> Direction:
+    """Convert the network output into the direction the snake moves"""
+    action = output.index(max(output))
+
+    if action == 0:
+        return Direction.EAST
+    elif action == 1:
+        return Direction.NORTH
+    elif action == 2:
+        return Direction.WEST
+    return Direction.SOUTH
+
+class Episode:
+    """Move budget and fitness bookkeeping of a network playing one game"""
+
+    def __init__(self, game: Simulation, record: bool = False, channel=None, max_frames: int = None,
+                 harvest: bool = False):
+        self.game = game
+        self.channel = channel
+        self.max_frames = max_frames
+
+        # Recent snapshots, the oldest is the state some moves before a death
+        self.harvest = deque(maxlen=2) if harvest else None
+        self.frames = 0
+        self.max_moves = 50
+        self.debuff = 0
+        self.death = "quit"
+
+        # Direction values of every move, kept to replay the episode
+        self.actions = bytearray() if record else None
+        self.start = game.snake.head_position()
+
+    def restore(self, state: bytes):
+        """Continue from a game snapshot instead of the start"""
+        self.max_moves, self.frames = self.game.restore(state)
+        self.start = self.game.snake.head_position()
+        # A record replays from the seed and start cell, which a snapshot does not have
+        self.actions = None
+
+    def inputs(self):
+        """Sensor inputs of the network"""
+        return self.game.sensor_inputs(self.game.snake.head_position())
+
+    def advance(self, output):
+        """Move the snake with the network output and check if the game ended"""
+        self.move(output_direction(output))
+
+    def move(self, direction: Direction):
+        """Move the snake in a direction and check if the game ended"""
+        game = self.game
+        self.frames += 1
+        self.max_moves -= 1
+        if self.actions is not None:
+            self.actions.append(direction.value)
+
+        if game.step(direction):
+            self.max_moves = 200
+
+        if not game.in_bounds():
+            self.debuff = 2000
+            self.death = "wall"
+            game.snake.is_alive = False
+        elif game.snake.is_collision():
+            # If snake collides with itself, reset
+            self.death = "body"
+            game.snake.is_alive = False
+        elif self.max_moves == 0:
+            self.death = "starved"
+            game.snake.is_alive = False
+        elif self.max_frames is not None and self.frames >= self.max_frames:
+            # Cut short by the scheduler's time budget, the same for every genome of the generation
+            self.death = "truncated"
+            game.snake.is_alive = False
+
+        # Send the state to the viewer if it shows this episode
+        if self.channel is not None:
+            self.channel(game)
+
+        if self.harvest is not None and self.frames % HARVEST_INTERVAL == 0 and game.snake.is_alive and \
+                game.snake.length >= HARVEST_LENGTH:
+            self.harvest.append(game.snapshot(self.max_moves, self.frames))
+
+    def fitness(self):
+        game = self.game
+        max_length = math.sqrt(game.width**2 + game.height**2)
+        return game.snake.length * 500 + self.frames ** 2 + max_length - game.distance(game.snake.head_position(), game.apple.position()) - self.debuff
+
+    def stats(self):
+        stats = {"length": self.game.snake.length, "frames": self.frames, "death": self.death}
+        if self.actions is not None:
+            game = self.game
+            stats["record"] = EpisodeRecord(game.seed, game.width, game.height, game.size, self.start, self.actions)
+        if self.harvest is not None:
+            # States that led to a crash are the hard ones
+            stats["hard"] = self.harvest[0] if self.harvest and self.death in ("wall", "body") else None
+        return stats
+
+def simulate(game: Simulation, network, render: bool = False, profiler: PhaseProfiler = None, record: bool = False,
+             channel=None, max_frames: int = None, state: bytes = None, harvest: bool = False):
+    """Play one episode of the game with the network, returns the fitness and episode stats
+
+    Episodes started from a snapshot score the fitness gained over the snapshot"""
+    episode = Episode(game, record, channel, max_frames, harvest)
+    start = 0
+    if state is not None:
+        episode.restore(state)
+        start = episode.fitness()
+    if profiler is not None:
+        network = profiler.instrument(game, network)
+
+    while game.snake.is_alive:
+        if render:
+            if not game.poll_events():
+                game.snake.is_alive = False
+            game.render()
+
+        episode.advance(network.activate(episode.inputs()))
+
+    if profiler is not None:
+        profiler.restore(game)
+    return episode.fitness() - start, episode.stats()
+
+class BatchEpisodes:
+    """Move budget and fitness bookkeeping of a batch of networks, each playing its game of the batch like Episode"""
+
+    def __init__(self, batch: BatchSimulation, record: bool = False):
+        self.batch = batch
+        self.frames = np.zeros(batch.count, dtype=np.int64)
+        self.max_moves = np.full(batch.count, 50, dtype=np.int64)
+        self.debuff = np.zeros(batch.count, dtype=np.int64)
+        self.deaths = ["quit"] * batch.count
+
+        # Games still playing and the direction values of every move, kept to replay the episodes
+        self.playing = np.arange(batch.count)
+        self.actions = [bytearray() for _ in range(batch.count)] if record else None
+
+    def inputs(self):
+        """Sensor inputs of the networks of the games still playing"""
+        return self.batch.sensor_inputs(self.playing)
+
+    def advance(self, outputs):
+        """Move the snakes with the network outputs of the games still playing and end the games that are over"""
+        batch = self.batch
+        games = self.playing
+        headings = OUTPUT_HEADINGS[np.argmax(outputs, axis=1)]
+        self.frames[games] += 1
+        self.max_moves[games] -= 1
+        if self.actions is not None:
+            for game, heading in zip(games.tolist(), headings.tolist()):
+                self.actions[game].append(heading)
+
+        eating = batch.step(games, headings)
+        self.max_moves[games[eating]] = 200
+
+        # The same checks in the same order as Episode.move
+        wall = ~batch.in_bounds(games)
+        body = ~wall & batch.is_collision(games)
+        starved = ~wall & ~body & (self.max_moves[games] == 0)
+        self.debuff[games[wall]] = 2000
+        for deaths, death in ((wall, "wall"), (body, "body"), (starved, "starved")):
+            for game in games[deaths].tolist():
+                self.deaths[game] = death
+        self.playing = games[~(wall | body | starved)]
+
+    def fitness(self, game: int):
+        batch = self.batch
+        max_length = math.sqrt(batch.width**2 + batch.height**2)
+        head, apple = batch.positions(game)[0], batch.apple_position(game)
+        distance = math.sqrt((apple[1] - head[1])**2 + (apple[0] - head[0])**2)
+        return int(batch.length[game]) * 500 + int(self.frames[game]) ** 2 + max_length - distance - int(self.debuff[game])
+
+    def stats(self, game: int):
+        batch = self.batch
+        stats = {"length": int(batch.length[game]), "frames": int(self.frames[game]), "death": self.deaths[game]}
+        if self.actions is not None:
+            stats["record"] = EpisodeRecord(batch.seeds[game], batch.width, batch.height, batch.size, batch.start,
+                                            self.actions[game])
+        return stats
+
+def evaluate_batch(genomes, config, seed: int = None, profiler: PhaseProfiler = None, record: bool = False):
+    """Play a game for every genome on one BatchSimulation, stepping and sensing all games with array operations"""
+    genomes = list(genomes)
+    network = CompiledNetwork([genome for _, genome in genomes], config)
+    batch = create_batch([episode_seed(seed, genome_id) for genome_id, _ in genomes], config_blocks(config))
+    episodes = BatchEpisodes(batch, record)
+    if profiler is not None:
+        batch.sensor_inputs = profiler.timed("sensors", batch.sensor_inputs)
+        batch.step = profiler.timed("direction", batch.step)
+        network.activate_batch = profiler.timed("activate", network.activate_batch)
+    inputs = np.zeros((len(genomes), network.num_inputs))
+
+    while len(episodes.playing):
+        playing = episodes.playing
+        inputs[playing] = episodes.inputs()
+        outputs = network.activate_batch(inputs)
+        episodes.advance(outputs[playing])
+
+    return {genome_id: (episodes.fitness(i), episodes.stats(i)) for i, (genome_id, _) in enumerate(genomes)}
+
+def evaluate_lockstep(genomes, config, seed: int = None, profiler: PhaseProfiler = None, record: bool = False,
+                      viewer=None):
+    """Play a game for every genome in lockstep, activating all networks in one batch per step
+
+    The games run on a BatchSimulation unless they need the flood sensors or a viewer, which take a Simulation each"""
+    blocks = config_blocks(config)
+    if viewer is None and "flood" not in blocks:
+        return evaluate_batch(genomes, config, seed, profiler, record)
+
+    genomes = list(genomes)
+    network = CompiledNetwork([genome for _, genome in genomes], config)
+    episodes = [Episode(create_game(episode_seed(seed, genome_id), blocks), record,
+                        viewer.channel(genome_id) if viewer is not None else None)
+                for genome_id, _ in genomes]
+    if profiler is not None:
+        for episode in episodes:
+            profiler.instrument(episode.game)
+        network.activate_batch = profiler.timed("activate", network.activate_batch)
+    inputs = np.zeros((len(genomes), network.num_inputs))
+
+    playing = list(range(len(episodes)))
+    while playing:
+        for i in playing:
+            inputs[i] = episodes[i].inputs()
+        outputs = network.activate_batch(inputs)
+
+        for i in playing:
+            episodes[i].advance(outputs[i].tolist())
+        playing = [i for i in playing if episodes[i].game.snake.is_alive]
+
+    return {genome_id: (episode.fitness(), episode.stats()) for (genome_id, _), episode in zip(genomes, episodes)}
+
+def evaluate_episode(genome, config, seed: int = None, game: Simulation = None, profiler: PhaseProfiler = None,
+                     record: bool = False, channel=None, max_frames: int = None, state: bytes = None,
+                     harvest: bool = False):
+    """Score a genome on a headless game, reusing the game if one is given, from the start or a snapshot"""
+    if game is None:
+        game = create_game(seed, config_blocks(config))
+    else:
+        game.set_sensor_blocks(config_blocks(config))
+        if state is None:
+            game.reset(seed)
+
+    network = neat.nn.FeedForwardNetwork.create(genome, config)
+    return simulate(game, network, profiler=profiler, record=record, channel=channel, max_frames=max_frames,
+                    state=state, harvest=harvest)
+
+def run_episodes(episodes, config, harvest: bool = False, profiler: PhaseProfiler = None, recorder=None, viewer=None):
+    """Play (genome_id, genome, seed[, state]) episodes on one reused game, returns (genome_id, fitness, stats) in order"""
+    game = create_game(blocks=config_blocks(config))
+    results = []
+    for genome_id, genome, seed, *state in episodes:
+        channel = viewer.channel(genome_id) if viewer is not None else None
+        fitness, stats = evaluate_episode(genome, config, seed, game, profiler=profiler, record=recorder is not None,
+                                          channel=channel, state=state[0] if state else None, harvest=harvest)
+        if recorder is not None:
+            recorder.add(genome_id, fitness, stats)
+        results.append((genome_id, fitness, stats))
+    return results
+
+def evaluate_fitness(genome, config, seed: int = None):
+    """Score a genome on a headless game, as fast as the CPU allows"""
+    fitness, _ = evaluate_episode(genome, config, seed)
+    return fitness
+
+def watch_genome(genome, config, seed: int = None, fps: int = 15):
+    """Render a genome playing the game in a window"""
+    # Imported here so headless training never loads pygame
+    from game.game import Game
+
+    screen = get_screen(WIDTH, HEIGHT)
+    game = Game(screen, Entity(200, 200, 20, (0, 255, 0)), (255, 255, 255), fps=fps, seed=seed)
+    game.set_sensor_blocks(config_blocks(config))
+    network = neat.nn.FeedForwardNetwork.create(genome, config)
+    fitness, _ = simulate(game, network, render=True)
+    return fitness
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+
+from collections import deque
+import numpy as np
+import json
+import time
+import neat
+import os
+
+QUANTILES = (0, 25, 50, 75, 100)
+
+class HistoryReporter(neat.reporting.BaseReporter):
+    """Appends one compact record per generation to a JSONL file, keeping only rolling aggregates in memory"""
+
+    def __init__(self, filename: str, window: int = 100):
+        folder = os.path.dirname(filename)
+        if folder and not os.path.exists(folder):
+            os.makedirs(folder)
+        self.filename = filename
+        self.generation = 0
+        self.start = None
+
+        # Rolling windows over the last generations
+        self.best = deque(maxlen=window)
+        self.mean = deque(maxlen=window)
+        self.times = deque(maxlen=window)
+
+    def start_generation(self, generation):
+        self.generation = generation
+        self.start = time.perf_counter()
+
+    def post_evaluate(self, config, population, species, best_genome):
+        elapsed = time.perf_counter() - self.start
+        fitness = np.array([genome.fitness for genome in population.values()], dtype=np.float64)
+        sizes = np.array([genome.size() for genome in population.values()])
+
+        record = {
+            "generation": self.generation,
+            "time": elapsed,
+            "population": len(population),
+            "fitness": {
+                "quantiles": np.percentile(fitness, QUANTILES).tolist(),
+                "mean": float(fitness.mean()),
+                "stdev": float(fitness.std()),
+            },
+            "best": {"key": best_genome.key, "fitness": best_genome.fitness, "size": list(best_genome.size())},
+            "species": {str(key): len(s.members) for key, s in species.species.items()},
+            "nodes": {"mean": float(sizes[:, 0].mean()), "max": int(sizes[:, 0].max())},
+            "connections": {"mean": float(sizes[:, 1].mean()), "max": int(sizes[:, 1].max())},
+        }
+
+        # Appending and closing keeps every finished generation on disk if the run dies
+        with open(self.filename, "a") as f:
+            f.write(json.dumps(record, separators=(",", ":")) + "\n")
+
+        self.best.append(best_genome.fitness)
+        self.mean.append(record["fitness"]["mean"])
+        self.times.append(elapsed)
+
+    def checkpoint_state(self) -> dict:
+        """Rolling windows to save with a checkpoint"""
+        return {"best": list(self.best), "mean": list(self.mean), "times": list(self.times)}
+
+    def restore_state(self, state: dict):
+        """Continue the rolling windows of a checkpoint"""
+        self.best.extend(state["best"])
+        self.mean.extend(state["mean"])
+        self.times.extend(state["times"])
+
+    def rolling(self) -> dict:
+        """Averages over the generations in the rolling window"""
+        if not self.times:
+            return {}
+        return {
+            "generations": len(self.times),
+            "best": max(self.best),
+            "mean": sum(self.mean) / len(self.mean),
+            "time": sum(self.times) / len(self.times),
+        }
+
+def field(record: dict, name: str):
+    """Value of a dotted field such as fitness.mean, None if the record lacks it"""
+    value = record
+    for key in name.split("."):
+        if not isinstance(value, dict) or key not in value:
+            return None
+        value = value[key]
+    return value
+
+def load_history(filename: str, fields: list[str] = None, start: int = 0, stop: int = None):
+    """Stream the records of generations start to stop, limited to the given dotted fields"""
+    with open(filename) as f:
+        for line in f:
+            # A run killed mid write leaves a partial last line
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            generation = record["generation"]
+            if generation < start:
+                continue
+            if stop is not None and generation >= stop:
+                break
+            if fields is None:
+                yield record
+            else:
+                yield {"generation": generation, **{name: field(record, name) for name in fields}}
+
+def history_column(filename: str, name: str, start: int = 0, stop: int = None) -> list:
+    """Values of one dotted field for every generation"""
+    return [record[name] for record in load_history(filename, [name], start, stop)]
@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+
+from algorithm.evaluation import evaluate_lockstep
+from algorithm.speciation import CachedSpeciesSet
+
+from multiprocessing.connection import Client, Listener
+import multiprocessing
+import itertools
+import threading
+import secrets
+import random
+import queue
+import neat
+import os
+
+def genome_signature(config) -> tuple[int, int]:
+    """Inputs and outputs of a config's networks, genomes only migrate between islands that agree on them"""
+    return (config.genome_config.num_inputs, config.genome_config.num_outputs)
+
+class Migration(neat.reporting.BaseReporter):
+    """Sends the best genomes of an island to the next one in the ring and takes in the genomes sent to it"""
+
+    def __init__(self, population, index: int, addresses: list, authkey: bytes, interval: int = 5, migrants: int = 3):
+        self.population = population
+        self.config = population.config
+        self.index = index
+        self.address = addresses[index]
+        self.neighbor = addresses[(index + 1) % len(addresses)]
+        self.interval = interval
+        self.migrants = migrants
+        self.authkey = authkey
+        self.generation = 0
+        self.arrivals = queue.Queue()
+        self.listener = Listener(self.address, authkey=authkey)
+
+        # Accept migrants in the background so a slow or restarting peer never blocks evolution
+        thread = threading.Thread(target=self.receive, daemon=True)
+        thread.start()
+
+    def receive(self):
+        """Queue the genomes of every incoming migration"""
+        while True:
+            try:
+                with self.listener.accept() as connection:
+                    signature, genomes = connection.recv()
+            except (OSError, EOFError, multiprocessing.AuthenticationError):
+                continue
+            if signature == genome_signature(self.config):
+                self.arrivals.put(genomes)
+
+    def send(self, genomes):
+        """Send genomes to the neighbor, dropping them if it is down"""
+        try:
+            with Client(self.neighbor, authkey=self.authkey) as connection:
+                connection.send((genome_signature(self.config), genomes))
+        except (OSError, EOFError, multiprocessing.AuthenticationError):
+            print(f"Island {self.index}: neighbor {self.neighbor} unreachable, migration dropped")
+
+    def start_generation(self, generation):
+        self.generation = generation
+        self.immigrate()
+
+    def post_evaluate(self, config, population, species, best_genome):
+        if self.generation % self.interval == self.interval - 1:
+            best = sorted(population.values(), key=lambda genome: genome.fitness, reverse=True)
+            self.send(best[:self.migrants])
+
+    def immigrate(self):
+        """Replace random members of the population with the genomes that arrived"""
+        arrivals = []
+        while not self.arrivals.empty():
+            arrivals.extend(self.arrivals.get())
+        if not arrivals:
+            return
+
+        population = self.population.population
+        reproduction = self.population.reproduction
+        arrivals = arrivals[:len(population)]
+        for key, genome in zip(random.sample(list(population), len(arrivals)), arrivals):
+            del population[key]
+            genome.key = next(reproduction.genome_indexer)
+            genome.fitness = None
+            population[genome.key] = genome
+
+        # New node keys must not collide with the nodes the migrants brought along
+        genome_config = self.config.genome_config
+        if genome_config.node_indexer is not None:
+            node = max(key for genome in arrivals for key in genome.nodes)
+            genome_config.node_indexer = itertools.count(max(next(genome_config.node_indexer), node + 1))
+
+        self.population.species.speciate(self.config, population, self.generation)
+        print(f"Island {self.index}: {len(arrivals)} migrants arrived")
+
+def evaluate_island(genomes, config, seed: int = None):
+    """Evaluate an island's generation in lockstep within its process"""
+    genomes = list(genomes)
+    results = evaluate_lockstep(genomes, config, seed)
+    for genome_id, genome in genomes:
+        genome.fitness, _ = results[genome_id]
+
+def run_island(index: int, config_file: str, addresses: list, authkey: bytes, generations: int, interval: int,
+               migrants: int, seed: int, results):
+    """Evolve one island, reporting its winner on the results queue"""
+    config = neat.config.Config(neat.DefaultGenome, neat.DefaultReproduction,
+                                neat.DefaultSpeciesSet, neat.DefaultStagnation,
+                                config_file)
+    config.species_set_type = CachedSpeciesSet
+    if seed is not None:
+        random.seed(seed + index)
+
+    p = neat.Population(config)
+    p.add_reporter(neat.StdOutReporter(False))
+    p.add_reporter(Migration(p, index, addresses, authkey, interval, migrants))
+
+    winner = p.run(lambda genomes, config: evaluate_island(genomes, config, seed), generations)
+    results.put((index, config_file, winner))
+
+def run_islands(config_files: list[str], generations: int = 50, interval: int = 5, migrants: int = 3,
+                seed: int = None, host: str = "localhost", port: int = 6100, restarts: int = 3, authkey: bytes = None):
+    """Evolve one population per config in its own process, migrating the best genomes around a ring"""
+    # Migrations are unpickled, so only peers holding the key may connect. A fresh key only reaches this run's
+    # islands, listening beyond this machine needs a key the caller shares with the other hosts
+    if authkey is None:
+        if host not in ("localhost", "127.0.0.1", "::1"):
+            raise ValueError(f"Islands listening on {host} need an authkey shared with the other hosts")
+        authkey = secrets.token_bytes(32)
+    addresses = [(host, port + i) for i in range(len(config_files))]
+    results = multiprocessing.Queue()
+
+    def start(index):
+        process = multiprocessing.Process(target=run_island, args=(index, config_files[index], addresses, authkey,
+                                                                    generations, interval, migrants, seed, results))
+        process.start()
+        return process
+
+    processes = [start(index) for index in range(len(config_files))]
+    winners = {}
+
+    # Restart islands that crash, the others keep evolving and drop migrations meanwhile
+    while len(winners) < len(processes):
+        try:
+            index, config_file, winner = results.get(timeout=1.0)
+            winners[index] = (config_file, winner)
+        except queue.Empty:
+            pass
+
+        for index, process in enumerate(processes):
+            if index not in winners and process.exitcode not in (None, 0):
+                if restarts <= 0:
+                    raise RuntimeError(f"Island {index} ({config_files[index]}) failed")
+                print(f"Island {index} exited with code {process.exitcode}, restarting")
+                restarts -= 1
+                processes[index] = start(index)
+
+    for process in processes:
+        process.join()
+
+    best_file, best = max(winners.values(), key=lambda winner: winner[1].fitness)
+    print('\nBest genome ({}):\n{!s}'.format(os.path.basename(best_file), best))
+    return winners
+
+if __name__ == '__main__':
+    parent = os.getcwd()
+    run_islands([os.path.join(parent + '/config', name) for name in ('config-feedforward2.txt',) * 4])
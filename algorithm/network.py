@@ -1,14 +1,21 @@
 #!/usr/bin/env python3
 
-from game.game import Game
-from components.snake import Snake
-from components.entity import Entity
-from components.utils import Action, Direction
-
-import pygame
+from algorithm.evaluation import episode_seed, evaluate_episode, evaluate_lockstep, run_episodes
+from algorithm.parallel import PoolEvaluator
+from algorithm.scheduler import ScheduledEvaluator
+from algorithm.cache import FitnessCache
+from algorithm.profiler import PhaseProfiler
+from algorithm.recording import EpisodeRecorder
+from algorithm.racing import RacingEvaluator
+from algorithm.bank import StateBank
+from algorithm.speciation import CachedSpeciesSet
+from algorithm.viewer import Viewer
+from algorithm.history import HistoryReporter
+from algorithm.checkpoint import Checkpointer, latest_checkpoint, restore_checkpoint, restore_reporters
+
+import argparse
 import pickle
 import neat
-import math
 import os
 
 def save_generation(generation, generation_num, save_folder):
@@ -21,103 +28,148 @@ def save_generation(generation, generation_num, save_folder):
     with open(filename, "wb") as f:
         pickle.dump(generation, f)
 
-def evaluate_fitness(genome, config):
-    width, height = 420, 420
-    screen = pygame.display.set_mode((width, height))
-    game = Game(screen, Entity(200, 200, 20, (0, 255, 0)), (255, 255, 255), fps=15)
-    network = neat.nn.FeedForwardNetwork.create(genome, config)
-    frames = 0
-    max_moves = 50
-    debuff = 0
-
-    max_length = math.sqrt(width**2 + height**2)
-
-    while game.snake.is_alive:
-        frames += 1
-        max_moves -= 1
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                game.snake.is_alive = False
-                break
-
-        game.surface.fill("black")
-
-        game.snake.draw(game.surface)
-        game.draw_apple()
-
-        game.clock.tick(game.fps)
-
-        inputs = game.sensor_data(game.snake.head.position())
-        # print("Sensors:", inputs)
-        output = network.activate(inputs)
-        # print("OUTPUT:", output)
-        action = output.index(max(output))
-        # print("ACTION:", action)
-        # print()
-        pygame.display.update()
-
-        if action == 0:
-            action = Direction.EAST
-        elif action == 1:
-            action = Direction.NORTH
-        elif action == 2:
-            action = Direction.WEST
-        else:
-            action = Direction.SOUTH
-
-        game.snake.direction(action)
-        if game.snake.is_eating(game.apple):
-            # If snake collides with apple, spawn new apple and add to snake
-            game.snake.add()
-            game.apple = game.spawn_apple()
-            max_moves = 200
-
-        if not game.in_bounds():
-            debuff = 2000
-            game.snake.is_alive = False
-            break
-
-        if game.snake.is_collision():
-            # If snake collides with itself, reset
-            game.snake.is_alive = False
-            break
-            # game.snake.reset()
-            # game.apple = game.spawn_apple()
-
-        if max_moves == 0:
-            game.snake.is_alive = False
-            break
-
-    pygame.quit()
-    return game.snake.length * 500 + frames ** 2 + max_length - game.distance(game.snake.head.position(), game.apple.position()) - debuff
-
-def evaluate_genomes(genomes, config):
+def evaluate_genomes(genomes, config, seed: int = None, profiler: PhaseProfiler = None,
+                     recorder: EpisodeRecorder = None, viewer: Viewer = None):
     for genome_id, genome in genomes:
-        fitness = evaluate_fitness(genome, config)
+        channel = viewer.channel(genome_id) if viewer is not None else None
+        fitness, stats = evaluate_episode(genome, config, episode_seed(seed, genome_id), profiler=profiler,
+                                          record=recorder is not None, channel=channel)
         genome.fitness = fitness
+        if recorder is not None:
+            recorder.add(genome_id, fitness, stats)
         print(f"Fitness[{genome_id}]:", fitness)
 
-def run(config_file):
+def evaluate_genomes_lockstep(genomes, config, seed: int = None, profiler: PhaseProfiler = None,
+                              recorder: EpisodeRecorder = None, viewer: Viewer = None):
+    genomes = list(genomes)
+    results = evaluate_lockstep(genomes, config, seed, profiler, record=recorder is not None, viewer=viewer)
+    for genome_id, genome in genomes:
+        genome.fitness, stats = results[genome_id]
+        if recorder is not None:
+            recorder.add(genome_id, genome.fitness, stats)
+        print(f"Fitness[{genome_id}]:", genome.fitness)
+
+def run(config_file, workers: int = 1, chunksize: int = 1, seed: int = None, lockstep: bool = False,
+        cache_size: int = 0, profile: bool = False, record_folder: str = None, episodes: int = 1,
+        view: str = None, view_every: int = 10, history_file: str = None, schedule: bool = False,
+        budget: float = None, checkpoint_folder: str = None, checkpoint_interval: int = 1, resume: bool = False,
+        bank_states: int = 0, frame_limits: dict = None, initial_episodes: int = 1, eta: int = 2):
+    # Lockstep plays a whole generation in this process, one episode per genome
+    if lockstep and (workers > 1 or episodes > 1 or bank_states > 0):
+        raise ValueError("lockstep evaluation runs in one process, it cannot be combined with workers, racing or the "
+                         "state bank")
+    # The scheduler orders and caps single episodes per genome, racing and the bank would bypass it
+    if (schedule or budget is not None) and (episodes > 1 or bank_states > 0):
+        raise ValueError("schedule and budget only apply to one episode per genome, not to racing or the state bank")
+    if (schedule or budget is not None or frame_limits is not None) and workers <= 1:
+        raise ValueError("schedule, budget and frame_limits plan episodes over a worker pool, they need workers > 1")
+
     config = neat.config.Config(neat.DefaultGenome, neat.DefaultReproduction,
                                 neat.DefaultSpeciesSet, neat.DefaultStagnation,
                                 config_file)
+    # Same species as the default set, with distances kept between generations and computed in bulk
+    config.species_set_type = CachedSpeciesSet
 
-    # Create the population, which is the top-level object for a NEAT run.
-    p = neat.Population(config)
+    # Create the population, which is the top-level object for a NEAT run, or continue from the latest checkpoint.
+    reporter_states = {}
+    if resume and checkpoint_folder is not None and latest_checkpoint(checkpoint_folder) is not None:
+        p, reporter_states = restore_checkpoint(checkpoint_folder, config)
+        print(f"Resuming from generation {p.generation}")
+    else:
+        p = neat.Population(config)
 
     # Add a stdout reporter to show progress in the terminal.
     p.add_reporter(neat.StdOutReporter(True))
-    stats = neat.StatisticsReporter()
-    p.add_reporter(stats)
-    # p.add_reporter(neat.Checkpointer(5))
+    # Stream per generation statistics to disk instead of keeping every generation in memory
+    if history_file is not None:
+        p.add_reporter(HistoryReporter(history_file))
+    else:
+        stats = neat.StatisticsReporter()
+        p.add_reporter(stats)
+
+    # Checkpoint in the background so the next generation never waits on the disk
+    checkpointer = None
+    if checkpoint_folder is not None:
+        checkpointer = Checkpointer(p, checkpoint_folder, checkpoint_interval)
+        p.add_reporter(checkpointer)
+
+    # Break each generation's evaluation time down by step phase
+    profiler = None
+    if profile:
+        profiler = PhaseProfiler()
+        p.add_reporter(profiler)
+
+    # Record every episode so it can be replayed later
+    recorder = None
+    if record_folder is not None:
+        recorder = EpisodeRecorder(record_folder)
+        p.add_reporter(recorder)
+
+    # Show the best genome, or every few genomes, in a viewer window that never holds up training
+    viewer = None
+    if view is not None:
+        viewer = Viewer(view, view_every)
+        p.add_reporter(viewer)
+        viewer.start()
+
+    # Evaluate in a pool of worker processes if more than one worker is requested
+    evaluator = None
+    if workers > 1 and (schedule or budget is not None):
+        # Longest predicted episodes first, capped to fit the per generation time budget
+        evaluator = ScheduledEvaluator(workers, seed, profiler, recorder, viewer, budget, p.reproduction, frame_limits)
+        evaluator.generation = p.generation
+    elif workers > 1:
+        evaluator = PoolEvaluator(workers, chunksize, seed, profiler, recorder, viewer)
+
+    # Racing and the state bank play their episodes on the pool, or one after another with the same options
+    runner = evaluator.run_episodes if evaluator is not None else (
+        lambda episodes, config, **kwargs: run_episodes(episodes, config, profiler=profiler, recorder=recorder,
+                                                        viewer=viewer, **kwargs))
+
+    if episodes > 1:
+        # Race genomes over several episodes, stopping the hopeless ones early
+        fitness_function = RacingEvaluator(episodes, initial_episodes, eta, seed, runner).evaluate
+    elif bank_states > 0:
+        # Also play a few hard states harvested from earlier generations instead of only the easy opening
+        fitness_function = StateBank(states=bank_states, seed=seed, runner=runner).evaluate
+    elif evaluator is not None:
+        fitness_function = evaluator.evaluate
+    elif lockstep:
+        fitness_function = lambda genomes, config: evaluate_genomes_lockstep(genomes, config, seed, profiler, recorder, viewer)
+    else:
+        fitness_function = lambda genomes, config: evaluate_genomes(genomes, config, seed, profiler, recorder, viewer)
+
+    # Skip genomes whose network and episode have been evaluated before, racing, the bank and unseeded runs draw new
+    # episodes every generation
+    if cache_size > 0 and seed is not None and episodes == 1 and bank_states == 0:
+        cache = FitnessCache(cache_size)
+        p.add_reporter(cache)
+        fitness_function = cache.cached(fitness_function, seed)
+
+    restore_reporters(p, reporter_states)
 
     # Run for up to 50 generations.
-    winner = p.run(evaluate_genomes, 50)
+    winner = p.run(fitness_function, 50 - p.generation)
+
+    if evaluator is not None:
+        evaluator.close()
+    if viewer is not None:
+        viewer.close()
+    if checkpointer is not None:
+        checkpointer.flush()
 
     # show final stats
     print('\nBest genome:\n{!s}'.format(winner))
 
+def resume(config_file, checkpoint_folder: str, **kwargs):
+    """Continue a run from the latest checkpoint in the folder"""
+    run(config_file, checkpoint_folder=checkpoint_folder, resume=True, **kwargs)
+
 if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Train snake networks with NEAT")
+    parser.add_argument("--workers", type=int, default=1, help="worker processes evaluating genomes")
+    args = parser.parse_args()
+
     parent = os.getcwd()
     config_path = os.path.join(parent + '/config', 'config-feedforward2.txt')
-    run(config_path)
+    run(config_path, workers=args.workers)
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+
+from algorithm.evaluation import WIDTH, HEIGHT, config_blocks, create_game, episode_seed, evaluate_episode
+from algorithm.profiler import PhaseProfiler
+from algorithm.recording import EpisodeRecorder
+from algorithm.viewer import Channel, Viewer
+from game.sensors import sensor_table
+
+import multiprocessing
+import time
+import os
+
+# Per process state of a pool worker
+_worker_game = None
+_worker_config = None
+_worker_frames = None
+
+def _initialize_worker(config, frames=None):
+    """Create the persistent headless game of a pool worker"""
+    global _worker_game, _worker_config, _worker_frames
+    _worker_game = create_game(blocks=config_blocks(config))
+    _worker_config = config
+    _worker_frames = frames
+
+def _evaluate_task(task):
+    """Evaluate a single genome inside a pool worker"""
+    genome_id, genome, seed, state, profile, record, view, max_frames, harvest = task
+    profiler = PhaseProfiler() if profile else None
+    # The generation to show the episode under, None if it is not shown
+    channel = Channel(_worker_frames, genome_id, view) if view is not None else None
+    start = time.perf_counter()
+    fitness, stats = evaluate_episode(genome, _worker_config, seed, game=_worker_game, profiler=profiler, record=record,
+                                      channel=channel, max_frames=max_frames, state=state, harvest=harvest)
+    stats["seconds"] = time.perf_counter() - start
+
+    # Send the phase timings back to be merged by the evaluator
+    if profiler is not None:
+        stats["phases"] = profiler.totals
+    return genome_id, fitness, stats
+
+class PoolEvaluator:
+    """Evaluates a population across a pool of worker processes"""
+
+    def __init__(self, workers: int = None, chunksize: int = 1, seed: int = None, profiler: PhaseProfiler = None,
+                 recorder: EpisodeRecorder = None, viewer: Viewer = None):
+        self.workers = workers or os.cpu_count()
+        self.chunksize = chunksize
+        self.seed = seed
+        self.profiler = profiler
+        self.recorder = recorder
+        self.viewer = viewer
+        self.pool = None
+        self.config = None
+        self.stats = {}
+
+    def start(self, config):
+        """Start the worker pool for the given config"""
+        self.close()
+        # Build the sensor table before forking so the workers share it instead of each building their own
+        sensor_table(WIDTH, HEIGHT, 20)
+        self.pool = multiprocessing.Pool(self.workers, initializer=_initialize_worker,
+                                         initargs=(config, self.viewer.frames if self.viewer is not None else None))
+        self.config = config
+
+    def close(self):
+        """Stop the worker pool"""
+        if self.pool is not None:
+            self.pool.close()
+            self.pool.join()
+            self.pool = None
+
+    def run_episodes(self, episodes, config, max_frames: int = None, ordered: bool = True, harvest: bool = False):
+        """Play (genome_id, genome, seed[, state]) episodes on the pool, returns (genome_id, fitness, stats) in order or as they finish"""
+        if self.pool is None or config is not self.config:
+            self.start(config)
+
+        profile = self.profiler is not None
+        record = self.recorder is not None
+        tasks = [(genome_id, genome, seed, state[0] if state else None, profile, record, self.view(genome_id), max_frames,
+                  harvest) for genome_id, genome, seed, *state in episodes]
+
+        results = []
+        imap = self.pool.imap if ordered else self.pool.imap_unordered
+        for genome_id, fitness, stats in imap(_evaluate_task, tasks, self.chunksize):
+            if profile:
+                self.profiler.merge(stats.pop("phases"))
+            if record:
+                self.recorder.add(genome_id, fitness, stats)
+            results.append((genome_id, fitness, stats))
+        return results
+
+    def view(self, genome_id: int):
+        """Generation the viewer shows a genome's episode under, None if it is not shown"""
+        if self.viewer is None or self.viewer.channel(genome_id) is None:
+            return None
+        return self.viewer.generation
+
+    def evaluate(self, genomes, config):
+        """Evaluate all genomes of a generation, usable as a NEAT fitness function"""
+        genomes = dict(genomes)
+        episodes = [(genome_id, genome, episode_seed(self.seed, genome_id)) for genome_id, genome in genomes.items()]
+
+        self.stats = {}
+        for genome_id, fitness, stats in self.run_episodes(episodes, config):
+            genomes[genome_id].fitness = fitness
+            self.stats[genome_id] = stats
+            print(f"Fitness[{genome_id}]:", fitness)
+
+    def __del__(self):
+        self.close()
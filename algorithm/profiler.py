@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+
+import logging
+import time
+import neat
+
+logger = logging.getLogger(__name__)
+
+# Methods timed in each phase of a step, as (object, method) pairs
+PHASES = {
+    "events": [("game", "poll_events")],
+    "render": [("game", "render")],
+    "sensors": [("game", "sensor_inputs")],
+    "activate": [],
+    "direction": [("snake", "direction")],
+    "collisions": [("snake", "is_eating"), ("game", "in_bounds"), ("snake", "is_collision")],
+    "spawn": [("snake", "add"), ("game", "spawn_apple")],
+}
+
+class PhaseProfiler(neat.reporting.BaseReporter):
+    """Accumulates time and calls of every phase of the step loop, reported each generation"""
+
+    def __init__(self):
+        self.totals = {phase: [0.0, 0] for phase in PHASES}
+        self.generation = None
+        self.start = None
+
+    def timed(self, phase: str, function):
+        """Wrap a function so its time and calls count towards a phase"""
+        totals = self.totals[phase]
+        clock = time.perf_counter
+
+        def timed_function(*args, **kwargs):
+            start = clock()
+            result = function(*args, **kwargs)
+            totals[0] += clock() - start
+            totals[1] += 1
+            return result
+        return timed_function
+
+    def instrument(self, game, network=None):
+        """Time the phases of a game by shadowing its methods, returns the timed network"""
+        objects = {"game": game, "snake": game.snake}
+        for phase, methods in PHASES.items():
+            for name, method in methods:
+                target = objects[name]
+                if hasattr(target, method):
+                    setattr(target, method, self.timed(phase, getattr(target, method)))
+
+        if network is not None:
+            network.activate = self.timed("activate", network.activate)
+        return network
+
+    def restore(self, game):
+        """Remove the timing wrappers from a game so it can be reused"""
+        objects = {"game": game, "snake": game.snake}
+        for methods in PHASES.values():
+            for name, method in methods:
+                objects[name].__dict__.pop(method, None)
+
+    def merge(self, totals: dict):
+        """Add the totals of another profiler, such as one in a pool worker"""
+        for phase, (seconds, calls) in totals.items():
+            self.totals[phase][0] += seconds
+            self.totals[phase][1] += calls
+
+    def start_generation(self, generation):
+        self.generation = generation
+        self.totals = {phase: [0.0, 0] for phase in PHASES}
+        self.start = time.perf_counter()
+
+    def post_evaluate(self, config, population, species, best_genome):
+        elapsed = time.perf_counter() - self.start
+        print(f"Step phases, {elapsed:.3f}s of evaluation:")
+
+        for phase, (seconds, calls) in self.totals.items():
+            if calls == 0:
+                continue
+            share = 100.0 * seconds / elapsed if elapsed else 0.0
+            print(f"  {phase:<11} {seconds:9.3f}s {calls:9d} calls {seconds / calls * 1e6:9.2f}us/call {share:5.1f}%")
+
+        logger.info("generation %s phases %s evaluation %.6f", self.generation, self.totals, elapsed)
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+
+from components.utils import pack_actions, unpack_actions
+
+import struct
+import neat
+import os
+
+# Genome id, seed, board width and height, cell size, head start, steps and fitness
+HEADER = struct.Struct("<QQHHHhhId")
+
+class EpisodeRecord:
+    """Everything needed to replay an episode: seed, initial state and the actions taken"""
+
+    def __init__(self, seed: int, width: int, height: int, size: int, start: tuple[int, int], actions,
+                 fitness: float = 0.0, genome_id: int = 0):
+        self.genome_id = genome_id
+        self.seed = seed
+        self.width = width
+        self.height = height
+        self.size = size
+        self.start = start
+        self.actions = bytes(actions)
+        self.fitness = fitness
+
+    @property
+    def steps(self):
+        return len(self.actions)
+
+    def to_bytes(self) -> bytes:
+        """Serialize the record, about a quarter byte per step"""
+        header = HEADER.pack(self.genome_id, self.seed, self.width, self.height, self.size,
+                             self.start[0], self.start[1], self.steps, self.fitness)
+        return header + pack_actions(self.actions)
+
+    @staticmethod
+    def from_bytes(data: bytes, offset: int = 0):
+        """Deserialize a record, returns it and the offset after it"""
+        genome_id, seed, width, height, size, x, y, steps, fitness = HEADER.unpack_from(data, offset)
+        offset += HEADER.size
+        end = offset + (steps + 3) // 4
+        actions = unpack_actions(data[offset:end], steps)
+        return EpisodeRecord(seed, width, height, size, (x, y), actions, fitness, genome_id), end
+
+def save_records(records, filename: str):
+    """Append records to a file"""
+    with open(filename, "ab") as f:
+        for record in records:
+            f.write(record.to_bytes())
+
+def load_records(filename: str) -> list[EpisodeRecord]:
+    """Read every record of a file"""
+    with open(filename, "rb") as f:
+        data = f.read()
+
+    records = []
+    offset = 0
+    while offset < len(data):
+        record, offset = EpisodeRecord.from_bytes(data, offset)
+        records.append(record)
+    return records
+
+class EpisodeRecorder(neat.reporting.BaseReporter):
+    """Keeps the record of every evaluated episode, one file per generation"""
+
+    def __init__(self, folder: str):
+        self.folder = folder
+        self.generation = 0
+        self.records = []
+        os.makedirs(folder, exist_ok=True)
+
+    def add(self, genome_id: int, fitness: float, stats: dict):
+        """Keep the record an episode left in its stats"""
+        record = stats.pop("record", None)
+        if record is not None:
+            record.genome_id = genome_id
+            record.fitness = fitness
+            self.records.append(record)
+
+    def filename(self, generation: int) -> str:
+        return os.path.join(self.folder, f"generation_{generation}.rec")
+
+    def start_generation(self, generation):
+        self.generation = generation
+        self.records = []
+
+    def post_evaluate(self, config, population, species, best_genome):
+        save_records(self.records, self.filename(self.generation))
+        self.records = []
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+
+from algorithm.evaluation import Episode
+from algorithm.recording import EpisodeRecord, load_records
+from components.entity import Entity
+from components.utils import Direction
+from game.display import close_display, get_screen
+from game.simulation import Simulation
+
+import argparse
+
+def replay(record: EpisodeRecord, render: bool = True, fps: int = 15):
+    """Play a recorded episode back, returns the fitness it reaches"""
+    head = Entity(record.start[0], record.start[1], record.size, (0, 255, 0))
+    if render:
+        from game.game import Game
+
+        screen = get_screen(record.width, record.height)
+        game = Game(screen, head, (255, 255, 255), fps=fps, seed=record.seed)
+    else:
+        game = Simulation(record.width, record.height, head, (255, 255, 255), seed=record.seed)
+
+    episode = Episode(game)
+    for action in record.actions:
+        if render:
+            if not game.poll_events():
+                break
+            game.render()
+        episode.move(Direction(action))
+
+    return episode.fitness()
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay recorded training episodes")
+    parser.add_argument("recording", help="generation recording file")
+    parser.add_argument("--genome", type=int, help="replay the episode of this genome id")
+    parser.add_argument("--worst", action="store_true", help="replay the worst episode instead of the best")
+    parser.add_argument("--fps", type=int, default=15)
+    parser.add_argument("--verify", action="store_true", help="replay every episode headless and check its fitness")
+    args = parser.parse_args()
+
+    records = load_records(args.recording)
+
+    if args.verify:
+        mismatches = [record.genome_id for record in records if replay(record, render=False) != record.fitness]
+        print(f"{len(records) - len(mismatches)} of {len(records)} episodes replay to their fitness")
+        if mismatches:
+            print("Mismatched genomes:", mismatches)
+        return
+
+    if args.genome is not None:
+        record = next(record for record in records if record.genome_id == args.genome)
+    elif args.worst:
+        record = min(records, key=lambda record: record.fitness)
+    else:
+        record = max(records, key=lambda record: record.fitness)
+
+    print(f"Genome {record.genome_id}: {record.steps} steps, fitness {record.fitness}")
+    replay(record, fps=args.fps)
+    close_display()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+
+from algorithm.evaluation import episode_seed
+from algorithm.parallel import PoolEvaluator
+
+import numpy as np
+import time
+
+# Relative cost of a frame, the sensors cost about as much as this many connections
+FRAME_COST = 50
+# Frames assumed for genomes without any recorded ancestor, a bad genome starves after 50 moves
+DEFAULT_FRAMES = 50
+
+class ScheduledEvaluator(PoolEvaluator):
+    """Dispatches the longest predicted episodes first and caps episode length to fit a time budget"""
+
+    def __init__(self, workers: int = None, seed: int = None, profiler=None, recorder=None, viewer=None,
+                 budget: float = None, reproduction=None, limits: dict = None):
+        super().__init__(workers, 1, seed, profiler, recorder, viewer)
+        self.budget = budget
+        self.reproduction = reproduction
+
+        # Episode cap of every generation, caps given for a generation are replayed instead of fitted to the clock
+        self.limits = dict(limits or {})
+        self.generation = 0
+
+        # Episode frames of the last generation, the parents of the next one
+        self.frames = {}
+        # Seconds per episode and per frame in a worker, fitted on the last generation
+        self.overhead = None
+        self.frame_time = None
+        # Share of the wall time the workers spent playing, the rest goes to dispatch and transfer
+        self.utilization = 1.0
+        self.max_frames = None
+        self.truncated = 0
+
+    def predict_frames(self, genome_id: int) -> float:
+        """Episode length of a genome, its own if it was evaluated before, else the mean of its parents'"""
+        if genome_id in self.frames:
+            return self.frames[genome_id]
+
+        parents = ()
+        if self.reproduction is not None:
+            parents = self.reproduction.ancestors.get(genome_id, ())
+        known = [self.frames[parent] for parent in parents if parent in self.frames]
+        if known:
+            return sum(known) / len(known)
+        if self.frames:
+            return sum(self.frames.values()) / len(self.frames)
+        return DEFAULT_FRAMES
+
+    def predict_cost(self, genome_id: int, genome) -> float:
+        """Predicted evaluation time of a genome in arbitrary units"""
+        _, connections = genome.size()
+        return self.predict_frames(genome_id) * (FRAME_COST + connections)
+
+    def frame_limit(self, predictions: list[float]):
+        """Largest episode length whose predicted total work and longest episode both fit in the budget
+
+        The cap follows the worker times measured on the last generation, so the same seed can give other caps on
+        another machine or under other load. Tying it to wall time keeps each generation within the budget, the caps
+        are kept in limits so passing them to a new evaluator replays a run exactly"""
+        if self.budget is None or self.frame_time is None:
+            return None
+
+        # Fill the workers up to the budget, the longest episodes are cut at the same length
+        capacity = (self.budget * self.workers * self.utilization - len(predictions) * self.overhead) / self.frame_time
+        limit = (self.budget - self.overhead) / self.frame_time
+        predictions = sorted(predictions)
+        used = 0.0
+        for i, frames in enumerate(predictions):
+            remaining = len(predictions) - i
+            if used + frames * remaining > capacity:
+                limit = min(limit, (capacity - used) / remaining)
+                break
+            used += frames
+        return max(1, int(limit))
+
+    def fit_times(self, samples: list[tuple[int, float]]):
+        """Fit episode time as a fixed overhead plus a time per frame"""
+        frames, seconds = np.array(samples, dtype=np.float64).T
+        if frames.min() < frames.max():
+            self.frame_time, self.overhead = np.polyfit(frames, seconds, 1)
+        if frames.min() == frames.max() or self.frame_time <= 0:
+            self.frame_time, self.overhead = seconds.sum() / frames.sum(), 0.0
+        self.overhead = max(0.0, self.overhead)
+
+    def evaluate(self, genomes, config):
+        """Evaluate all genomes of a generation longest first, usable as a NEAT fitness function"""
+        genomes = dict(genomes)
+
+        # Longest first, idle workers take the next task from the pool's shared queue
+        costs = {genome_id: self.predict_cost(genome_id, genome) for genome_id, genome in genomes.items()}
+        order = sorted(genomes, key=lambda genome_id: (-costs[genome_id], genome_id))
+        episodes = [(genome_id, genomes[genome_id], episode_seed(self.seed, genome_id)) for genome_id in order]
+        predictions = {genome_id: self.predict_frames(genome_id) for genome_id in order}
+        if self.generation in self.limits:
+            self.max_frames = self.limits[self.generation]
+        else:
+            self.max_frames = self.limits[self.generation] = self.frame_limit(list(predictions.values()))
+
+        # Pool start up is not part of the measured time
+        if self.pool is None or config is not self.config:
+            self.start(config)
+        start = time.perf_counter()
+        results = self.run_episodes(episodes, config, self.max_frames, ordered=False)
+        elapsed = time.perf_counter() - start
+
+        self.stats = {}
+        self.frames = {}
+        self.truncated = 0
+        seconds = []
+        for genome_id, fitness, stats in results:
+            genomes[genome_id].fitness = fitness
+            self.stats[genome_id] = stats
+            self.frames[genome_id] = stats["frames"]
+            if stats["death"] == "truncated":
+                # A truncated episode only shows a lower bound of its length
+                self.frames[genome_id] = max(stats["frames"], predictions[genome_id])
+                self.truncated += 1
+            seconds.append((stats["frames"], stats["seconds"]))
+            print(f"Fitness[{genome_id}]:", fitness)
+        self.fit_times(seconds)
+        self.utilization = min(1.0, sum(second for _, second in seconds) / (elapsed * self.workers))
+        if self.max_frames is not None:
+            print(f"Scheduler: {elapsed:.2f}s, generation {self.generation} episodes capped at {self.max_frames} "
+                  f"frames, {self.truncated} truncated")
+        self.generation += 1
@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+
+from neat.math_util import mean, stdev
+import numpy as np
+import time
+import neat
+
+class GenomeGenes:
+    """Gene values of a genome as arrays, columns number the innovation keys seen during the run"""
+
+    def __init__(self, genome, species_set):
+        self.genome = genome
+        nodes = genome.nodes.values()
+        connections = genome.connections.values()
+
+        # Arrays follow the dict order of the genome so sums add the genes in the order genome.distance does
+        self.node_columns = species_set.columns(species_set.node_columns, genome.nodes)
+        self.bias = np.array([node.bias for node in nodes], dtype=np.float64)
+        self.response = np.array([node.response for node in nodes], dtype=np.float64)
+        self.activation = species_set.columns(species_set.functions, [node.activation for node in nodes])
+        self.aggregation = species_set.columns(species_set.functions, [node.aggregation for node in nodes])
+
+        self.connection_columns = species_set.columns(species_set.connection_columns, genome.connections)
+        self.weight = np.array([connection.weight for connection in connections], dtype=np.float64)
+        self.enabled = np.array([connection.enabled for connection in connections], dtype=np.float64)
+
+class GeneMatrix:
+    """Genes of a population as dense rows over the innovations it holds, NaN where a genome lacks a gene"""
+
+    def __init__(self, genes: list[GenomeGenes]):
+        self.nodes = np.array([len(g.node_columns) for g in genes], dtype=np.float64)
+        self.connections = np.array([len(g.connection_columns) for g in genes], dtype=np.float64)
+
+        rows = np.repeat(np.arange(len(genes)), self.nodes.astype(np.intp))
+        columns = np.concatenate([g.node_columns for g in genes])
+        self.node_columns = np.unique(columns)
+        self.bias, self.response, self.activation, self.aggregation = (
+            self.fill(rows, np.searchsorted(self.node_columns, columns), len(genes), len(self.node_columns),
+                      np.concatenate([getattr(g, name) for g in genes]))
+            for name in ("bias", "response", "activation", "aggregation"))
+
+        rows = np.repeat(np.arange(len(genes)), self.connections.astype(np.intp))
+        columns = np.concatenate([g.connection_columns for g in genes])
+        self.connection_columns = np.unique(columns)
+        self.weight, self.enabled = (
+            self.fill(rows, np.searchsorted(self.connection_columns, columns), len(genes),
+                      len(self.connection_columns), np.concatenate([getattr(g, name) for g in genes]))
+            for name in ("weight", "enabled"))
+
+    @staticmethod
+    def fill(rows: np.ndarray, columns: np.ndarray, height: int, width: int, values: np.ndarray) -> np.ndarray:
+        # The extra last column stays NaN for innovations no genome of the population has
+        matrix = np.full((height, width + 1), np.nan)
+        matrix[rows, columns] = values
+        return matrix
+
+    @staticmethod
+    def local(columns: np.ndarray, innovations: np.ndarray) -> np.ndarray:
+        """Matrix columns of innovation columns, the NaN column for those the population lacks"""
+        index = np.searchsorted(innovations, columns)
+        found = index < len(innovations)
+        found[found] = innovations[index[found]] == columns[found]
+        return np.where(found, index, len(innovations))
+
+def sequential_sum(values: np.ndarray) -> np.ndarray:
+    """Row sums added left to right like a Python loop, numpy's sum pairs them up and rounds differently"""
+    if values.shape[1] == 0:
+        return np.zeros(values.shape[0])
+    return np.cumsum(values, axis=1)[:, -1]
+
+def gene_distance(total: np.ndarray, disjoint: np.ndarray, larger: np.ndarray, config) -> np.ndarray:
+    """Node or connection part of the compatibility distance, 0 where neither genome has genes"""
+    distance = np.zeros(len(total))
+    present = larger > 0
+    distance[present] = (total[present] + config.compatibility_disjoint_coefficient * disjoint[present]) / larger[present]
+    return distance
+
+class CachedSpeciesSet(neat.DefaultSpeciesSet):
+    """DefaultSpeciesSet that keeps distances between generations and computes new ones a representative at a time"""
+
+    def __init__(self, config, reporters):
+        super().__init__(config, reporters)
+        self.node_columns = {}
+        self.connection_columns = {}
+        self.functions = {}
+        self.genes = {}
+
+        # Distances by (representative, genome) key pair, genomes never change once created
+        self.pairs = {}
+        self.time = 0.0
+        self.computed = 0
+        self.reused = 0
+
+    def columns(self, columns: dict, keys) -> np.ndarray:
+        """Columns of innovation keys, new keys get the next columns"""
+        index = list(map(columns.get, keys))
+        if None in index:
+            for i, key in enumerate(keys):
+                if index[i] is None:
+                    index[i] = columns.setdefault(key, len(columns))
+        return np.array(index, dtype=np.intp)
+
+    def genome_genes(self, genome) -> GenomeGenes:
+        genes = self.genes.get(genome.key)
+        if genes is None or genes.genome is not genome:
+            if genes is not None:
+                # A key now names another genome, distances kept for it are stale
+                self.pairs = {}
+            genes = self.genes[genome.key] = GenomeGenes(genome, self)
+        return genes
+
+    def distances(self, representative, others: list, rows: dict, matrix: GeneMatrix, config):
+        """Distances from a representative to other genomes, computed together for the pairs not kept already"""
+        key = representative.key
+        missing = [genome.key for genome in others if (key, genome.key) not in self.pairs]
+        if not missing:
+            return
+        self.computed += len(missing)
+
+        rep = self.genome_genes(representative)
+        index = np.array([rows[other] for other in missing], dtype=np.intp)
+
+        # Node genes, homologous genes add their own distance in the representative's order
+        columns = np.ix_(index, matrix.local(rep.node_columns, matrix.node_columns))
+        bias = matrix.bias[columns]
+        homologous = ~np.isnan(bias)
+        d = np.abs(rep.bias - bias) + np.abs(rep.response - matrix.response[columns])
+        d = d + (rep.activation != matrix.activation[columns])
+        d = d + (rep.aggregation != matrix.aggregation[columns])
+        d = np.where(homologous, d * config.compatibility_weight_coefficient, 0.0)
+        shared = homologous.sum(axis=1)
+        own = len(rep.node_columns)
+        node_distance = gene_distance(sequential_sum(d), own - shared + matrix.nodes[index] - shared,
+                                      np.maximum(own, matrix.nodes[index]), config)
+
+        # Connection genes
+        columns = np.ix_(index, matrix.local(rep.connection_columns, matrix.connection_columns))
+        weight = matrix.weight[columns]
+        homologous = ~np.isnan(weight)
+        d = np.abs(rep.weight - weight) + (rep.enabled != matrix.enabled[columns])
+        d = np.where(homologous, d * config.compatibility_weight_coefficient, 0.0)
+        shared = homologous.sum(axis=1)
+        own = len(rep.connection_columns)
+        connection_distance = gene_distance(sequential_sum(d), own - shared + matrix.connections[index] - shared,
+                                            np.maximum(own, matrix.connections[index]), config)
+
+        for other, distance in zip(missing, (node_distance + connection_distance).tolist()):
+            self.pairs[key, other] = distance
+
+    def speciate(self, config, population, generation):
+        """Same species as DefaultSpeciesSet.speciate, which this follows step by step"""
+        start = time.perf_counter()
+        genome_config = config.genome_config
+        compatibility_threshold = self.species_set_config.compatibility_threshold
+        self.computed = 0
+        self.reused = 0
+
+        keys = list(population)
+        rows = {key: i for i, key in enumerate(keys)}
+        genes = [self.genome_genes(population[key]) for key in keys]
+        matrix = GeneMatrix(genes)
+
+        # Lookups go through a per generation cache filled in both directions, exactly like GenomeDistanceCache
+        cache = {}
+
+        def distance(representative, genome):
+            d = cache.get((representative.key, genome.key))
+            if d is None:
+                self.reused += 1
+                d = self.pairs[representative.key, genome.key]
+                cache[representative.key, genome.key] = d
+                cache[genome.key, representative.key] = d
+            return d
+
+        # Find the best representatives for each existing species.
+        # Built from an iterator like the default, a set made straight from a dict is sized differently and pops in another order
+        unspeciated = set(iter(population))
+        new_representatives = {}
+        new_members = {}
+        for sid, s in self.species.items():
+            others = [population[gid] for gid in unspeciated]
+            self.distances(s.representative, others, rows, matrix, genome_config)
+            candidates = [(distance(s.representative, g), g) for g in others]
+
+            # The new representative is the genome closest to the current representative.
+            _, new_rep = min(candidates, key=lambda x: x[0])
+            new_rid = new_rep.key
+            new_representatives[sid] = new_rid
+            new_members[sid] = [new_rid]
+            unspeciated.remove(new_rid)
+
+        # Every genome left is compared with every representative, including those created before it
+        others = [population[gid] for gid in unspeciated]
+        for rid in new_representatives.values():
+            self.distances(population[rid], others, rows, matrix, genome_config)
+
+        # Partition population into species based on genetic similarity.
+        while unspeciated:
+            gid = unspeciated.pop()
+            g = population[gid]
+
+            # Find the species with the most similar representative.
+            candidates = []
+            for sid, rid in new_representatives.items():
+                d = distance(population[rid], g)
+                if d < compatibility_threshold:
+                    candidates.append((d, sid))
+
+            if candidates:
+                _, sid = min(candidates, key=lambda x: x[0])
+                new_members[sid].append(gid)
+            else:
+                # No species is similar enough, create a new species, using this genome as its representative.
+                sid = next(self.indexer)
+                new_representatives[sid] = gid
+                new_members[sid] = [gid]
+                self.distances(g, [population[other] for other in unspeciated], rows, matrix, genome_config)
+
+        # Update species collection based on new speciation.
+        self.genome_to_species = {}
+        for sid, rid in new_representatives.items():
+            s = self.species.get(sid)
+            if s is None:
+                s = neat.species.Species(sid, generation)
+                self.species[sid] = s
+
+            members = new_members[sid]
+            for gid in members:
+                self.genome_to_species[gid] = sid
+
+            s.update(population[rid], {gid: population[gid] for gid in members})
+
+        # Only genomes of this generation can be compared again
+        self.genes = {key: self.genes[key] for key in population}
+        self.pairs = {pair: d for pair, d in self.pairs.items() if pair[0] in population and pair[1] in population}
+
+        self.time = time.perf_counter() - start
+        self.reporters.info('Mean genetic distance {0:.3f}, standard deviation {1:.3f}'.format(
+            mean(cache.values()), stdev(cache.values())))
+        self.reused -= self.computed
+        self.reporters.info(f"Speciation took {self.time:.4f} sec ({self.computed} distances computed, {self.reused} reused)")
@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+
+from algorithm.islands import evaluate_island
+from algorithm.speciation import CachedSpeciesSet
+
+from dataclasses import dataclass, field
+import multiprocessing
+import configparser
+import contextlib
+import itertools
+import argparse
+import random
+import queue
+import time
+import neat
+import csv
+import io
+import os
+
+COLUMNS = ["trial", "config", "overrides", "seed", "status", "generations", "best", "nodes", "connections", "seconds"]
+
+@dataclass
+class Trial:
+    """One NEAT run of a sweep: a config file, the parameters overriding it and a seed"""
+    index: int
+    config_file: str
+    overrides: dict = field(default_factory=dict)
+    seed: int = None
+
+    @property
+    def name(self) -> str:
+        return f"{self.index:03d}"
+
+    def describe(self) -> str:
+        return " ".join(f"{key}={value}" for key, value in self.overrides.items())
+
+def sweep_grid(config_files: list[str], overrides: dict = None, seeds: list = (None,)) -> list[Trial]:
+    """Every combination of config, override values and seed, overrides map section.key to a list of values"""
+    overrides = overrides or {}
+    keys = list(overrides)
+    trials = []
+    for config_file, values, seed in itertools.product(config_files, itertools.product(*overrides.values()), seeds):
+        trials.append(Trial(len(trials), config_file, dict(zip(keys, values)), seed))
+    return trials
+
+def write_config(trial: Trial, folder: str) -> str:
+    """Config file of a trial with its overrides applied, kept with the results to rerun it"""
+    parser = configparser.ConfigParser()
+    parser.read(trial.config_file)
+    for key, value in trial.overrides.items():
+        section, _, option = key.rpartition(".")
+        if not parser.has_section(section):
+            raise ValueError(f"Override {key} names no section of {trial.config_file}")
+        parser.set(section, option, str(value))
+
+    path = os.path.join(folder, f"trial_{trial.name}.txt")
+    with open(path, "w") as f:
+        parser.write(f)
+    return path
+
+class TrialStopped(Exception):
+    """Raised in a worker once the sweep gives up on its trial"""
+
+class Progress(neat.reporting.BaseReporter):
+    """Reports a trial's best fitness every generation and stops the run when the sweep asks"""
+
+    def __init__(self, index: int, progress, stops, generations: int):
+        self.index = index
+        self.progress = progress
+        self.stops = stops
+        self.generations = generations
+        self.generation = 0
+
+    def start_generation(self, generation):
+        self.generation = generation
+
+    def post_evaluate(self, config, population, species, best_genome):
+        self.progress.put((self.index, self.generation, best_genome.fitness))
+
+    def end_generation(self, config, population, species_set):
+        # A trial asked to stop on its last generation has finished anyway
+        if self.stops[self.index] and self.generation < self.generations - 1:
+            raise TrialStopped()
+
+# Shared with the workers when the pool starts
+_progress = None
+_stops = None
+
+def _initialize_worker(progress, stops):
+    global _progress, _stops
+    _progress = progress
+    _stops = stops
+
+def run_trial(trial: Trial, config_file: str, generations: int) -> dict:
+    """Run one trial to the end or until it is stopped, returns its row of the summary"""
+    start = time.perf_counter()
+    best = None
+    status = "finished"
+
+    # Runs share the terminal, only the summary rows are printed
+    with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+        config = neat.config.Config(neat.DefaultGenome, neat.DefaultReproduction,
+                                    neat.DefaultSpeciesSet, neat.DefaultStagnation,
+                                    config_file)
+        config.species_set_type = CachedSpeciesSet
+        if trial.seed is not None:
+            random.seed(trial.seed)
+
+        p = neat.Population(config)
+        stats = neat.StatisticsReporter()
+        p.add_reporter(stats)
+        p.add_reporter(Progress(trial.index, _progress, _stops, generations))
+        try:
+            best = p.run(lambda genomes, config: evaluate_island(genomes, config, trial.seed), generations)
+        except TrialStopped:
+            status = "stopped"
+        except neat.population.CompleteExtinctionException:
+            status = "extinct"
+    if best is None:
+        best = stats.best_genome() if stats.most_fit_genomes else None
+
+    nodes, connections = best.size() if best is not None else (None, None)
+    return {
+        "trial": trial.name,
+        "config": os.path.basename(trial.config_file),
+        "overrides": trial.describe(),
+        "seed": trial.seed,
+        "status": status,
+        "generations": len(stats.most_fit_genomes),
+        "best": best.fitness if best is not None else None,
+        "nodes": nodes,
+        "connections": connections,
+        "seconds": round(time.perf_counter() - start, 1),
+    }
+
+class MedianStopping:
+    """Stops trials whose best fitness so far is below the median of the other trials at the same generation"""
+
+    def __init__(self, grace: int = 10, quantile: float = 50.0, peers: int = 3):
+        self.grace = grace
+        self.quantile = quantile
+        self.peers = peers
+        # Best fitness so far of every trial at every generation it reached
+        self.curves = {}
+
+    def report(self, index: int, generation: int, fitness: float) -> bool:
+        """Record a generation of a trial, returns True if the trial should stop"""
+        curve = self.curves.setdefault(index, [])
+        curve.append(max(fitness, curve[-1]) if curve else fitness)
+        if generation < self.grace:
+            return False
+
+        others = [c[generation] for i, c in self.curves.items() if i != index and len(c) > generation]
+        if len(others) < self.peers:
+            return False
+        return curve[generation] < percentile(others, self.quantile)
+
+def percentile(values: list[float], q: float) -> float:
+    values = sorted(values)
+    position = (len(values) - 1) * q / 100.0
+    low = int(position)
+    high = min(low + 1, len(values) - 1)
+    return values[low] + (values[high] - values[low]) * (position - low)
+
+def run_sweep(trials: list[Trial], folder: str, workers: int = None, generations: int = 50,
+              stopping: MedianStopping = None) -> list[dict]:
+    """Run the trials on a bounded pool of worker processes, streaming each result to summary.csv as it ends"""
+    if not os.path.exists(folder):
+        os.makedirs(folder)
+    config_files = [write_config(trial, folder) for trial in trials]
+    workers = workers or os.cpu_count()
+
+    progress = multiprocessing.Queue()
+    stops = multiprocessing.Array("b", len(trials), lock=False)
+    finished = queue.Queue()
+
+    rows = []
+    with open(os.path.join(folder, "summary.csv"), "w", newline="") as f, \
+            multiprocessing.Pool(workers, initializer=_initialize_worker, initargs=(progress, stops),
+                                 maxtasksperchild=1) as pool:
+        writer = csv.DictWriter(f, fieldnames=COLUMNS)
+        writer.writeheader()
+        print(" ".join(f"{column:>12}" for column in COLUMNS))
+
+        for trial, config_file in zip(trials, config_files):
+            pool.apply_async(run_trial, (trial, config_file, generations), callback=finished.put,
+                             error_callback=lambda error, trial=trial: finished.put(failed_row(trial, error)))
+
+        while len(rows) < len(trials):
+            # Stopping decisions use every generation reported so far
+            try:
+                while True:
+                    index, generation, fitness = progress.get(timeout=0.1)
+                    if stopping is not None and not stops[index] and stopping.report(index, generation, fitness):
+                        stops[index] = 1
+            except queue.Empty:
+                pass
+
+            try:
+                while True:
+                    row = finished.get_nowait()
+                    rows.append(row)
+                    writer.writerow(row)
+                    f.flush()
+                    print(" ".join(f"{str(row[column]):>12}" for column in COLUMNS))
+            except queue.Empty:
+                pass
+
+    ranked = sorted(rows, key=lambda row: row["best"] if row["best"] is not None else float("-inf"), reverse=True)
+    print("\nBest trials:")
+    for row in ranked[:5]:
+        print(f"  {row['trial']} {row['config']} {row['overrides']} seed={row['seed']}: {row['best']}")
+    return ranked
+
+def failed_row(trial: Trial, error: Exception) -> dict:
+    row = dict.fromkeys(COLUMNS)
+    row.update(trial=trial.name, config=os.path.basename(trial.config_file), overrides=trial.describe(),
+               seed=trial.seed, status=f"failed: {error}")
+    return row
+
+def parse_override(text: str) -> tuple[str, list[str]]:
+    """section.key=value1,value2 as the key and its values"""
+    key, _, values = text.partition("=")
+    if not values:
+        raise argparse.ArgumentTypeError(f"Expected section.key=value[,value...], got {text}")
+    return key, values.split(",")
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a grid of NEAT configs, overrides and seeds on a worker pool")
+    parser.add_argument("configs", nargs="+", help="config files")
+    parser.add_argument("--set", type=parse_override, action="append", default=[], dest="overrides",
+                        help="override such as DefaultGenome.activation_default=tanh,relu, may be repeated")
+    parser.add_argument("--seeds", type=int, nargs="+", default=[0, 1, 2])
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--generations", type=int, default=50)
+    parser.add_argument("--grace", type=int, default=10, help="generations every trial runs before it can be stopped")
+    parser.add_argument("--quantile", type=float, default=50.0,
+                        help="trials below this percentile of the others at the same generation are stopped")
+    parser.add_argument("--no-stopping", action="store_true", help="run every trial to the end")
+    parser.add_argument("--output", default="sweep", help="folder for the trial configs and summary.csv")
+    args = parser.parse_args()
+
+    trials = sweep_grid(args.configs, dict(args.overrides), args.seeds)
+    stopping = None if args.no_stopping else MedianStopping(args.grace, args.quantile)
+    print(f"Sweeping {len(trials)} trials on {args.workers} workers")
+    run_sweep(trials, args.output, args.workers, args.generations, stopping)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+
+from algorithm.evaluation import WIDTH, HEIGHT
+from game.display import close_display, get_screen, load_pygame
+
+from collections import deque
+import multiprocessing
+import queue
+import neat
+
+POLICIES = ("best", "every")
+
+class Channel:
+    """Sends the states of one episode to the viewer, dropping them when its queue is full"""
+
+    def __init__(self, frames, genome_id: int, generation: int):
+        self.frames = frames
+        self.genome_id = genome_id
+        self.generation = generation
+
+    def __call__(self, game):
+        snapshot = (self.generation, self.genome_id, tuple(game.snake.positions()), game.apple.position())
+        try:
+            self.frames.put_nowait(snapshot)
+        except queue.Full:
+            pass
+
+def run_viewer(frames, width: int, height: int, size: int, fps: int, buffer: int):
+    """Render the snapshots coming in on the queue at up to fps frames per second"""
+    pygame = load_pygame()
+    surface = get_screen(width, height)
+    clock = pygame.time.Clock()
+    pending = deque(maxlen=buffer)
+
+    while True:
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                close_display()
+                return
+
+        # Take everything that arrived, the oldest frames fall off when the viewer is behind
+        try:
+            while True:
+                snapshot = frames.get_nowait()
+                if snapshot is None:
+                    close_display()
+                    return
+                pending.append(snapshot)
+        except queue.Empty:
+            pass
+
+        if pending:
+            generation, genome_id, positions, apple = pending.popleft()
+            surface.fill((0, 0, 0))
+            for i, (x, y) in enumerate(positions):
+                color = (0, 255, 0) if i == 0 else (255, 255, 255)
+                pygame.draw.rect(surface, color, rect=(x, y, size, size))
+            pygame.draw.rect(surface, (255, 0, 0), rect=(apple[0], apple[1], size, size))
+            pygame.display.set_caption(f"Generation {generation} - genome {genome_id} - length {len(positions)}")
+            pygame.display.update()
+        clock.tick(fps)
+
+class Viewer(neat.reporting.BaseReporter):
+    """Shows training episodes in a separate process, the simulation never waits on the display"""
+
+    def __init__(self, policy: str = "best", every: int = 10, fps: int = 30, width: int = WIDTH, height: int = HEIGHT,
+                 size: int = 20, maxsize: int = 1024, buffer: int = 300):
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown view policy {policy}, expected one of {POLICIES}")
+        self.policy = policy
+        self.every = every
+        self.fps = fps
+        self.width = width
+        self.height = height
+        self.size = size
+        self.buffer = buffer
+        self.frames = multiprocessing.Queue(maxsize)
+        self.process = None
+        self.generation = 0
+        self.evaluated = 0
+        self.best = None
+
+    def start(self):
+        """Open the viewer window in its own process"""
+        self.process = multiprocessing.Process(target=run_viewer, daemon=True,
+                                               args=(self.frames, self.width, self.height, self.size, self.fps,
+                                                     self.buffer))
+        self.process.start()
+
+    def close(self):
+        """Ask the viewer to close and wait briefly for it"""
+        if self.process is not None:
+            try:
+                self.frames.put_nowait(None)
+            except queue.Full:
+                self.process.terminate()
+            self.process.join(timeout=5.0)
+            self.process = None
+
+    def watching(self, genome_id: int) -> bool:
+        """Decide whether the next evaluated genome is shown"""
+        self.evaluated += 1
+        if self.policy == "every":
+            return (self.evaluated - 1) % self.every == 0
+        # Elites keep their key, so last generation's best is evaluated again
+        if self.best is None:
+            return self.evaluated == 1
+        return genome_id == self.best
+
+    def channel(self, genome_id: int):
+        """Channel for a genome's episode, None if it is not shown"""
+        if self.process is None or not self.watching(genome_id):
+            return None
+        return Channel(self.frames, genome_id, self.generation)
+
+    def start_generation(self, generation):
+        self.generation = generation
+        self.evaluated = 0
+
+    def post_evaluate(self, config, population, species, best_genome):
+        self.best = best_genome.key
@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+
+from algorithm.evaluation import WIDTH, HEIGHT
+from algorithm.network import evaluate_genomes
+from algorithm.speciation import CachedSpeciesSet
+from components.entity import Entity
+from components.utils import Direction
+from game.sensors import sensor_table
+from game.simulation import Simulation
+
+from collections import deque
+import contextlib
+import argparse
+import platform
+import random
+import json
+import time
+import neat
+import io
+import os
+
+CONFIGS = ["config-feedforward.txt", "config-feedforward2.txt", "config-feedforward3.txt"]
+
+# Moves without an apple before a benchmark snake starves, the budget an episode gets after eating
+STARVE_MOVES = 200
+
+def create_game(board: int, seed: int = 0) -> Simulation:
+    """Headless square game with 20 pixel cells"""
+    start = (board // 40) * 20
+    return Simulation(board, board, Entity(start, start, 20, (0, 255, 0)), (255, 255, 255), seed=seed)
+
+def place_snake(game: Simulation, length: int):
+    """Lay a snake of the given length along a serpentine path from the top left corner"""
+    occupancy = game.occupancy
+    path = []
+    for y in range(occupancy.rows):
+        row = range(occupancy.columns) if y % 2 == 0 else range(occupancy.columns - 1, -1, -1)
+        path.extend(occupancy.index(x, y) for x in row)
+    if length > len(path) - 1:
+        raise ValueError(f"A snake of length {length} does not fit the board")
+
+    snake = game.snake
+    snake.reset()
+    occupancy.clear()
+    snake.cells = deque(reversed(path[:length]))
+    for index in snake.cells:
+        occupancy.add(index)
+
+    # Head towards the next cell of the path
+    snake.moving = True
+    snake.heading = snake.directions[path[length] - path[length - 1]].value
+    game.apple = game.spawn_apple()
+
+def safe_direction(game: Simulation, rng: random.Random) -> Direction:
+    """Random direction that does not kill the snake right away, if there is one"""
+    snake = game.snake
+    occupancy = game.occupancy
+    head = snake.cells[0]
+    choices = []
+    for direction in Direction:
+        x, y = occupancy.cell(head + snake.offsets[direction.value])
+        if occupancy.on_board(x, y) and occupancy.counts[head + snake.offsets[direction.value]] == 0:
+            choices.append(direction)
+    return rng.choice(choices) if choices else rng.choice(list(Direction))
+
+def bench_steps(board: int, length: int, steps: int) -> float:
+    """Steps per second of the move, eat and collide loop, the snake keeps the given length"""
+    game = create_game(board)
+    rng = random.Random(0)
+    place_snake(game, length)
+    elapsed = 0.0
+    moves = 0
+
+    for _ in range(steps):
+        direction = safe_direction(game, rng)
+
+        start = time.perf_counter()
+        ate = game.step(direction)
+        dead = not game.in_bounds() or game.snake.is_collision()
+        elapsed += time.perf_counter() - start
+        moves += 1
+
+        # Start over without counting the setup, after an apple the snake would be longer than the row says
+        if dead or ate or moves >= STARVE_MOVES:
+            place_snake(game, length)
+            moves = 0
+    return steps / elapsed
+
+def bench_call(function, calls: int) -> float:
+    """Microseconds per call of a function"""
+    start = time.perf_counter()
+    for _ in range(calls):
+        function()
+    return (time.perf_counter() - start) / calls * 1e6
+
+def load_config(name: str):
+    config = neat.config.Config(neat.DefaultGenome, neat.DefaultReproduction,
+                                neat.DefaultSpeciesSet, neat.DefaultStagnation,
+                                os.path.join("config", name))
+    config.species_set_type = CachedSpeciesSet
+    return config
+
+class GenerationTimer(neat.reporting.BaseReporter):
+    """Records the wall time of every generation and the part of it spent speciating"""
+
+    def __init__(self):
+        self.times = []
+        self.speciation = []
+        self.start = None
+
+    def start_generation(self, generation):
+        self.start = time.perf_counter()
+
+    def end_generation(self, config, population, species_set):
+        self.times.append(time.perf_counter() - self.start)
+        self.speciation.append(species_set.time)
+
+def bench_config(name: str, generations: int, seed: int) -> dict:
+    """Genomes per second of evaluate_genomes and wall time per NEAT generation"""
+    config = load_config(name)
+    random.seed(seed)
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        population = neat.Population(config)
+        genomes = list(population.population.items())
+        sensor_table(WIDTH, HEIGHT, 20)
+
+        start = time.perf_counter()
+        evaluate_genomes(genomes, config, seed)
+        genomes_per_second = len(genomes) / (time.perf_counter() - start)
+
+        timer = GenerationTimer()
+        population.add_reporter(timer)
+        population.run(lambda genomes, config: evaluate_genomes(genomes, config, seed), generations)
+
+    return {
+        "genomes_per_second": genomes_per_second,
+        "seconds_per_generation": sum(timer.times) / len(timer.times),
+        "speciation_per_generation": sum(timer.speciation) / len(timer.speciation),
+    }
+
+def run(boards: list[int], lengths: list[int], steps: int, calls: int, generations: int, seed: int) -> dict:
+    """Run every benchmark, returns the results keyed by name"""
+    results = {}
+
+    def record(name, value, unit, higher_is_better):
+        results[name] = {"value": value, "unit": unit, "higher_is_better": higher_is_better}
+        print(f"{name:<52} {value:>14.2f} {unit}")
+
+    for board in boards:
+        # Sensor tables are built on first use, build them here so the timed calls only look them up
+        sensor_table(board, board, 20)
+        for length in lengths:
+            if length >= (board // 20)**2:
+                continue
+            suffix = f"board={board}/length={length}"
+            record(f"step/{suffix}", bench_steps(board, length, steps), "steps/s", True)
+
+            game = create_game(board, seed)
+            place_snake(game, length)
+            head = game.snake.head_position()
+            record(f"sensor_data/{suffix}", bench_call(lambda: game.sensor_data(head), calls), "us/call", False)
+            record(f"line_sensor_data/{suffix}", bench_call(lambda: game.line_sensor_data(head), calls), "us/call", False)
+            game.set_sensor_blocks(("flood",))
+            record(f"flood_data/{suffix}", bench_call(game.flood_data, calls), "us/call", False)
+            record(f"calculate_entity_collision_points/{suffix}",
+                   bench_call(lambda: game.calculate_entity_collision_points(head), calls), "us/call", False)
+
+    for name in CONFIGS:
+        try:
+            timings = bench_config(name, generations, seed)
+        except (RuntimeError, ValueError) as error:
+            # Configs whose inputs do not match the sensors cannot be evaluated
+            print(f"{name}: skipped, {error}")
+            continue
+        record(f"evaluate_genomes/{name}", timings["genomes_per_second"], "genomes/s", True)
+        record(f"generation/{name}", timings["seconds_per_generation"], "s/generation", False)
+        record(f"speciation/{name}", timings["speciation_per_generation"], "s/generation", False)
+
+    return results
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list[str]:
+    """Names of the benchmarks that are worse than the baseline by more than the tolerance"""
+    regressions = []
+    print(f"\n{'benchmark':<52} {'baseline':>14} {'current':>14} {'change':>9}")
+
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        before, after = baseline[name]["value"], result["value"]
+        change = (after - before) / before if before else 0.0
+
+        # Positive change means faster
+        if not result["higher_is_better"]:
+            change = -change
+        flag = ""
+        if change < -tolerance:
+            regressions.append(name)
+            flag = " REGRESSION"
+        print(f"{name:<52} {before:>14.2f} {after:>14.2f} {change:>+8.1%}{flag}")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark simulation, sensor and evolution throughput")
+    parser.add_argument("--boards", type=int, nargs="+", default=[420, 840], help="board sizes in pixels")
+    parser.add_argument("--lengths", type=int, nargs="+", default=[1, 20, 100], help="snake lengths")
+    parser.add_argument("--steps", type=int, default=20000, help="steps per step benchmark")
+    parser.add_argument("--calls", type=int, default=2000, help="calls per sensor benchmark")
+    parser.add_argument("--generations", type=int, default=3, help="NEAT generations per config")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--save", help="write the results to a JSON baseline")
+    parser.add_argument("--compare", help="compare the results against a JSON baseline")
+    parser.add_argument("--tolerance", type=float, default=0.1, help="allowed slowdown before a regression")
+    args = parser.parse_args()
+
+    results = run(args.boards, args.lengths, args.steps, args.calls, args.generations, args.seed)
+
+    if args.save:
+        report = {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "results": results,
+        }
+        with open(args.save, "w") as f:
+            json.dump(report, f, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)["results"]
+        if compare(results, baseline, args.tolerance):
+            raise SystemExit(1)
+
+if __name__ == '__main__':
+    main()
@@ -1,7 +1,7 @@
 #!/usr/bin/env python3
 
 from components.utils import Direction
-import pygame
+from game.display import glyph, load_pygame
 
 class Entity:
     """Building block of a Snake"""
@@ -35,12 +35,11 @@ class Entity:
 
     def draw(self, surface):
         """Render the entity to the screen"""
+        pygame = load_pygame()
         pygame.draw.rect(surface, self.color, rect=(self.x, self.y, self.size, self.size))
 
     def draw_direction(self, surface):
         """Render the direction each entity is facing"""
-        font = pygame.font.Font(pygame.font.get_default_font(), 25)
-
         text = 'N'
         if self.direction == Direction.SOUTH:
             text = 'S'
@@ -49,8 +48,7 @@ class Entity:
         elif self.direction == Direction.EAST:
             text = 'E'
         # now print the text
-        text_surface = font.render(text, False, (0, 0, 0), None)
-        surface.blit(text_surface, dest=(self.x, self.y))
+        surface.blit(glyph(text, (0, 0, 0)), dest=(self.x, self.y))
 
     def position(self):
         """Return entity's coordinates"""
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+
+class Occupancy:
+    """Segment count of every board cell with a pool of the free cells"""
+
+    def __init__(self, columns: int, rows: int):
+        self.columns = columns
+        self.rows = rows
+
+        # Cells are indexed with a one cell margin so segments can sit just outside the board
+        self.stride = columns + 2
+        self.counts = [0] * (self.stride * (rows + 2))
+        self.occupied = set()
+
+        # Free board cells, slots holds the position of a cell in the pool or -1
+        self.free = []
+        self.slots = [-1] * len(self.counts)
+
+        # Free regions kept up to date by a flood fill sensor, if one is attached
+        self.regions = None
+        self.clear()
+
+    def index(self, x: int, y: int) -> int:
+        """Index of the cell at column x and row y"""
+        return (y + 1) * self.stride + x + 1
+
+    def cell(self, index: int) -> tuple[int, int]:
+        """Column and row of a cell index"""
+        y, x = divmod(index, self.stride)
+        return (x - 1, y - 1)
+
+    def on_board(self, x: int, y: int) -> bool:
+        """Verify the cell is inside the board"""
+        return 0 <= x < self.columns and 0 <= y < self.rows
+
+    def clear(self):
+        """Remove every segment, freeing the whole board"""
+        for index in self.occupied:
+            self.counts[index] = 0
+        self.occupied.clear()
+
+        for index in self.free:
+            self.slots[index] = -1
+        self.free = [self.index(x, y) for x in range(self.columns) for y in range(self.rows)]
+        for slot, index in enumerate(self.free):
+            self.slots[index] = slot
+
+        if self.regions is not None:
+            self.regions.rebuild()
+
+    def add(self, index: int):
+        """Place a segment on a cell"""
+        count = self.counts[index]
+        self.counts[index] = count + 1
+
+        if count == 0:
+            self.occupied.add(index)
+
+            # Swap remove the cell from the free pool
+            slot = self.slots[index]
+            if slot >= 0:
+                last = self.free.pop()
+                if last != index:
+                    self.free[slot] = last
+                    self.slots[last] = slot
+                self.slots[index] = -1
+
+            if self.regions is not None:
+                self.regions.fill(index)
+
+    def remove(self, index: int):
+        """Take a segment off a cell"""
+        count = self.counts[index] - 1
+        self.counts[index] = count
+
+        if count == 0:
+            self.occupied.discard(index)
+
+            # Return board cells to the free pool
+            x, y = self.cell(index)
+            if self.on_board(x, y):
+                self.slots[index] = len(self.free)
+                self.free.append(index)
+
+                if self.regions is not None:
+                    self.regions.free(index)
+
+    def count(self, x: int, y: int) -> int:
+        """Number of segments on the cell at column x and row y"""
+        if -1 <= x <= self.columns and -1 <= y <= self.rows:
+            return self.counts[(y + 1) * self.stride + x + 1]
+        return 0
+
+    def sample(self, rng) -> tuple[int, int]:
+        """Pick a random free board cell"""
+        return self.cell(self.free[rng.randrange(0, len(self.free))])
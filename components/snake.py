@@ -1,68 +1,115 @@
 #!/usr/bin/env python3
 
+from collections import deque
+
 from components.entity import Entity
+from components.occupancy import Occupancy
 from components.utils import Action, Direction
-from components.utils import left, right
 
 class Snake:
-    def __init__(self, head: Entity, body_color: tuple[int, int, int]):
-        self.head = head
+    def __init__(self, head: Entity, body_color: tuple[int, int, int], occupancy: Occupancy):
+        self.size = head.size
+        self.head_color = head.color
         self.start_x = head.x
         self.start_y = head.y
-        self.tail = head
-        self.body = [self.head]
         self.body_color = body_color
-        self.length = 1
+        self.occupancy = occupancy
         self.fitness = 0
         self.moving = False
         self.is_alive = True
 
+        # Cell index offset of each direction, indexed by Direction value
+        stride = occupancy.stride
+        self.offsets = (-stride, -1, stride, 1)
+        self.directions = {offset: Direction(value) for value, offset in enumerate(self.offsets)}
+
+        # Occupancy indices of the body from head to tail and the head's direction value
+        self.cells = deque([self.cell(head.x, head.y)])
+        self.heading = None
+        self.occupancy.add(self.cells[0])
+
+    @property
+    def length(self):
+        return len(self.cells)
+
+    @property
+    def head(self) -> Entity:
+        """Entity of the head, built on demand"""
+        return self.entity(0)
+
+    @property
+    def tail(self) -> Entity:
+        """Entity of the tail, built on demand"""
+        return self.entity(len(self.cells) - 1)
+
+    @property
+    def body(self) -> list[Entity]:
+        """Entities of the whole snake from head to tail, built on demand"""
+        return [self.entity(i) for i in range(len(self.cells))]
+
+    def cell(self, x: int, y: int) -> int:
+        """Occupancy index of the cell at a screen position"""
+        return self.occupancy.index(x // self.size, y // self.size)
+
+    def position(self, index: int) -> tuple[int, int]:
+        """Screen position of an occupancy index"""
+        x, y = self.occupancy.cell(index)
+        return (x * self.size, y * self.size)
+
+    def segment_direction(self, i: int) -> Direction:
+        """Direction the i-th segment is moving, each segment follows the one before it"""
+        if i == 0:
+            return None if self.heading is None else Direction(self.heading)
+        return self.directions[self.cells[i - 1] - self.cells[i]]
+
+    def entity(self, i: int) -> Entity:
+        """Build the entity of the i-th segment for rendering"""
+        x, y = self.position(self.cells[i])
+        entity = Entity(x, y, self.size, self.head_color if i == 0 else self.body_color)
+        entity.direction = self.segment_direction(i)
+        return entity
+
     def draw(self, surface):
         """Render all elements of the snake onto the surface"""
         for entity in self.body:
             entity.draw(surface)
 
+    def advance(self, heading: int):
+        """Push the next head cell and pop the tail cell"""
+        self.heading = heading
+        head = self.cells[0] + self.offsets[heading]
+
+        self.occupancy.remove(self.cells.pop())
+        self.cells.appendleft(head)
+        self.occupancy.add(head)
+
     def move(self, action: Action):
         """Move the snake with the new action"""
         if action == Action.NONE and not self.moving:
             return
-        direction = None
 
         if not self.moving:
             self.moving = True
 
             # Put direction in default state
-            direction = Direction.NORTH
+            heading = Direction.NORTH.value
 
             # Check directions left and right
             if action == Action.LEFT:
-                direction = Direction.WEST
+                heading = Direction.WEST.value
             elif action == Action.RIGHT:
-                direction = Direction.EAST
+                heading = Direction.EAST.value
         else:
             # Set to head's direction
-            direction = self.head.direction
+            heading = self.heading
 
             # Check actions left and right
             if action == Action.LEFT:
-                direction = left(direction)
+                heading = (heading + 1) % 4
             elif action == Action.RIGHT:
-                direction = right(direction)
-
-        # Set new head direction and position
-        # Need to update direction then move
-        self.head.direction = direction
-        self.head.move()
-
-        for i in range(len(self.body) - 1, 0, -1):
-            entity = self.body[i]
-            # If not the head element
-            if entity != self.head:
-                neighbor = self.body[i - 1]
+                heading = (heading - 1) % 4
 
-                # Move entity then update direction
-                entity.move()
-                entity.direction = neighbor.direction
+        self.advance(heading)
 
     def direction(self, action: Direction):
         """Move the snake with the new action"""
@@ -72,32 +119,22 @@ class Snake:
         if not self.moving:
             self.moving = True
 
-        # Set new head direction and position
-        # Need to update direction then move
-        self.head.direction = action
-        self.head.move()
+        self.advance(action.value)
 
-        for i in range(len(self.body) - 1, 0, -1):
-            entity = self.body[i]
-            # If not the head element
-            if entity != self.head:
-                neighbor = self.body[i - 1]
-
-                # Move entity then update direction
-                entity.move()
-                entity.direction = neighbor.direction
+    def head_position(self):
+        """Screen position of the head"""
+        return self.position(self.cells[0])
 
     def positions(self):
         """Get all snake body positions"""
-        return [entity.position() for entity in self.body]
+        return [self.position(index) for index in self.cells]
 
     def all_positions(self):
-        body = self.body[1:]
-        s = self.head.size
+        s = self.size
 
         positions = []
-        for entity in body:
-            x, y = entity.position()
+        for index in list(self.cells)[1:]:
+            x, y = self.position(index)
             positions.append((x, y))
             positions.append((x + s, y))
             positions.append((x, y + s))
@@ -106,52 +143,47 @@ class Snake:
 
     def add(self):
         """Add an element to the snake"""
-        x, y = self.tail.position()
-        size = self.tail.size
-        td = self.tail.direction
+        tail = self.cells[-1]
 
         # Spawn tail in opposite direction tail is going
-        if (td == Direction.NORTH):
-            y += size
-        elif (td == Direction.SOUTH):
-            y -= size
-        elif (td == Direction.EAST):
-            x -= size
+        if len(self.cells) > 1:
+            index = 2 * tail - self.cells[-2]
         else:
-            x += size
-
-        # Create enttiy in correct location
-        entity = Entity(x, y, size, self.body_color)
-        entity.direction = td
+            heading = Direction.WEST.value if self.heading is None else self.heading
+            index = tail - self.offsets[heading]
 
         # Update snake attributes
-        self.body.append(entity)
-        self.tail = entity
-        self.length += 1
+        self.cells.append(index)
+        self.occupancy.add(index)
+
+    def restore(self, cells: list[int], heading: int):
+        """Put the snake on the given cells, head first, moving in the heading"""
+        self.occupancy.clear()
+        self.cells = deque(cells)
+        for index in self.cells:
+            self.occupancy.add(index)
+        self.heading = heading
+        self.moving = heading is not None
+        self.is_alive = True
 
     def reset(self):
         """Reset the snake's state to default"""
-        # Reset head position
-        self.head.x = self.start_x
-        self.head.y = self.start_y
-
-        # Remove all body elements reset snake attributes
-        self.body = [self.head]
-        self.tail = self.head
-        self.length = 1
+        # Remove all body elements, put the head back at the start
+        self.occupancy.clear()
+        self.cells = deque([self.cell(self.start_x, self.start_y)])
+        self.occupancy.add(self.cells[0])
+        self.heading = None
         self.fitness = 0
 
         # Stop snake from moving on reset
         self.moving = False
+        self.is_alive = True
 
     def is_collision(self):
         """Verify if the head has collided with the body"""
-        head_position = self.head.position()
-        body_positions = [entity.position() for entity in self.body if entity != self.head]
-
-        # If head is in same position as body element
-        return head_position in body_positions
+        # If another segment is on the head's cell
+        return self.occupancy.counts[self.cells[0]] > 1
 
     def is_eating(self, apple: Entity):
         """Verify if the snake has collided with the apple"""
-        return self.head.position() == apple.position()
+        return self.head_position() == apple.position()
@@ -26,3 +26,14 @@ def right(direction: Direction) -> Direction:
     """Returns the direction to the right of the given direction"""
     new_value = (direction.value - 1) % len(Direction)
     return Direction(new_value)
+
+def pack_actions(actions) -> bytes:
+    """Pack direction values into 2 bits each, 4 to a byte"""
+    packed = bytearray((len(actions) + 3) // 4)
+    for i, action in enumerate(actions):
+        packed[i >> 2] |= action << ((i & 3) << 1)
+    return bytes(packed)
+
+def unpack_actions(packed: bytes, steps: int) -> list[int]:
+    """Direction values of packed actions"""
+    return [(packed[i >> 2] >> ((i & 3) << 1)) & 3 for i in range(steps)]
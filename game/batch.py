@@ -0,0 +1,262 @@
+#!/usr/bin/env python3
+
+from components.entity import Entity
+from game.sensors import sensor_table
+from game.simulation import SEEDS
+
+import numpy as np
+import random
+
+# Direction value of each argmax of a network output: east, north, west and south
+OUTPUT_HEADINGS = np.array([3, 0, 1, 2], dtype=np.int64)
+
+# Ray geometry arrays of every board size built in this process
+_RAYS = {}
+
+def ray_arrays(width: int, height: int, size: int):
+    """Ray geometry of a board size as arrays, built on first use"""
+    key = (width, height, size)
+    rays = _RAYS.get(key)
+    if rays is None:
+        rays = _RAYS[key] = RayArrays(sensor_table(width, height, size))
+    return rays
+
+class RayArrays:
+    """The sensor table padded into arrays indexed by head cell, ray and step
+
+    The last step of every ray is the wall, which is always hit"""
+
+    def __init__(self, table):
+        cells = table.columns * table.rows
+        steps = max(len(ray) for rays in table.rays for ray in rays) + 1
+
+        # Lattice points one column past the right margin, the north east ray runs further but only meets empty cells
+        lattice = table.columns + 2
+
+        self.lattice = np.zeros((cells, 8, steps), dtype=np.int64)
+        self.limit = np.full((cells, 8, steps), -1, dtype=np.int64)
+        self.distance = np.zeros((cells, 8, steps))
+        self.range = np.zeros((cells, 8, steps, 4), dtype=np.int64)
+        self.valid = np.zeros((cells, 8, steps), dtype=bool)
+
+        for index, (rays, walls, wall_ranges) in enumerate(zip(table.rays, table.walls, table.wall_ranges)):
+            row, column = divmod(index, table.columns)
+            for i, ray in enumerate(rays):
+                # Steps past the end of a shorter ray or the lattice are never hit
+                self.limit[index, i, len(ray):-1] = np.iinfo(np.int64).max
+                for k, (x, y, distance, cells_range) in enumerate(ray):
+                    if x >= lattice:
+                        self.limit[index, i, k] = np.iinfo(np.int64).max
+                        continue
+
+                    # Corners of the head are discounted once, the first one is also the head's own
+                    corner = int(column in (x, x - 1) and row in (y, y - 1))
+                    self.lattice[index, i, k] = y * lattice + x
+                    self.limit[index, i, k] = corner + (1 if k == 0 else 0)
+                    self.distance[index, i, k] = distance
+                    self.set_range(index, i, k, cells_range)
+                self.distance[index, i, -1] = walls[i]
+                self.set_range(index, i, steps - 1, wall_ranges[i])
+
+    def set_range(self, index: int, i: int, k: int, cells_range):
+        if cells_range is not None:
+            self.range[index, i, k] = cells_range
+            self.valid[index, i, k] = True
+
+class BatchSimulation:
+    """Many headless snake games stepped in lockstep, the board of every game kept as arrays
+
+    Each game follows the rules of Simulation and draws its apples the same way, so a game seeded here plays out
+    exactly like a Simulation with that seed"""
+
+    def __init__(self, count: int, width: int, height: int, head: Entity, seeds: list = None,
+                 blocks: tuple[str, ...] = ("rays",)):
+        if "flood" in blocks:
+            raise ValueError("The flood sensors are not vectorized, use Simulation for them")
+        self.count = count
+        self.width = width
+        self.height = height
+        self.size = head.size
+        self.blocks = tuple(blocks)
+        self.columns = width // self.size
+        self.rows = height // self.size
+        self.start = (head.x, head.y)
+
+        # Cells are indexed with a one cell margin like Occupancy, so the indices and offsets are the same
+        self.stride = self.columns + 2
+        self.offsets = np.array([-self.stride, -1, self.stride, 1], dtype=np.int64)
+        margin = self.stride * (self.rows + 2)
+        board = np.array([self.index(x, y) for x in range(self.columns) for y in range(self.rows)], dtype=np.int64)
+
+        # Pick a seed for every game without one so each can be replayed
+        seeds = [None] * count if seeds is None else list(seeds)
+        self.seeds = [SEEDS.getrandbits(63) if seed is None else seed for seed in seeds]
+        self.randoms = [random.Random(seed) for seed in self.seeds]
+
+        # Segment count of every cell and the pool of free board cells, swap removed in the same order as Occupancy
+        self.counts = np.zeros((count, margin), dtype=np.int64)
+        self.free = np.tile(board, (count, 1))
+        self.slots = np.full((count, margin), -1, dtype=np.int64)
+        self.slots[:, board] = np.arange(len(board))
+        self.free_count = np.full(count, len(board), dtype=np.int64)
+
+        # Bodies from head to tail in ring buffers, the head at first
+        self.capacity = len(board) + 2
+        self.cells = np.zeros((count, self.capacity), dtype=np.int64)
+        self.first = np.zeros(count, dtype=np.int64)
+        self.length = np.ones(count, dtype=np.int64)
+        self.heading = np.full(count, -1, dtype=np.int64)
+        self.apple = np.zeros(count, dtype=np.int64)
+
+        games = np.arange(count)
+        self.cells[:, 0] = self.index(head.x // self.size, head.y // self.size)
+        self.occupy(games, self.cells[:, 0])
+        self.spawn_apples(games)
+
+    def index(self, x, y):
+        """Index of the cell at column x and row y"""
+        return (y + 1) * self.stride + x + 1
+
+    def cell(self, index):
+        """Column and row of cell indices"""
+        y, x = np.divmod(index, self.stride)
+        return (x - 1, y - 1)
+
+    def head(self, games):
+        """Cell index of the head of the games"""
+        return self.cells[games, self.first[games]]
+
+    def tail(self, games, offset: int = 1):
+        """Cell index of the tail of the games, or of the segment offset - 1 before it"""
+        return self.cells[games, (self.first[games] + self.length[games] - offset) % self.capacity]
+
+    def positions(self, game: int) -> list[tuple[int, int]]:
+        """Screen positions of the snake of one game from head to tail"""
+        ring = (self.first[game] + np.arange(self.length[game])) % self.capacity
+        x, y = self.cell(self.cells[game, ring])
+        return [(column * self.size, row * self.size) for column, row in zip(x.tolist(), y.tolist())]
+
+    def apple_position(self, game: int) -> tuple[int, int]:
+        """Screen position of the apple of one game"""
+        x, y = self.cell(int(self.apple[game]))
+        return (x * self.size, y * self.size)
+
+    def occupy(self, games, cells):
+        """Place a segment on a cell of every game, taking newly occupied cells out of the free pool"""
+        counts = self.counts[games, cells]
+        self.counts[games, cells] = counts + 1
+
+        slots = self.slots[games, cells]
+        taken = (counts == 0) & (slots >= 0)
+        games, cells, slots = games[taken], cells[taken], slots[taken]
+
+        # Swap remove, the last free cell moves into the slot
+        self.free_count[games] -= 1
+        last = self.free[games, self.free_count[games]]
+        self.free[games, slots] = last
+        self.slots[games, last] = slots
+        self.slots[games, cells] = -1
+
+    def vacate(self, games, cells):
+        """Take a segment off a cell of every game, returning emptied board cells to the free pool"""
+        counts = self.counts[games, cells] - 1
+        self.counts[games, cells] = counts
+
+        x, y = self.cell(cells)
+        emptied = (counts == 0) & (0 <= x) & (x < self.columns) & (0 <= y) & (y < self.rows)
+        games, cells = games[emptied], cells[emptied]
+        self.slots[games, cells] = self.free_count[games]
+        self.free[games, self.free_count[games]] = cells
+        self.free_count[games] += 1
+
+    def spawn_apples(self, games):
+        """Spawn an apple on a random free cell of every game, drawn from the game's own random stream"""
+        for game in games.tolist():
+            self.apple[game] = self.free[game, self.randoms[game].randrange(0, int(self.free_count[game]))]
+
+    def step(self, games, headings):
+        """Move the snakes of the games one cell in the headings, returns the mask of the ones that ate"""
+        self.heading[games] = headings
+        head = self.head(games) + self.offsets[headings]
+
+        # The tail leaves before the head moves in
+        self.vacate(games, self.tail(games))
+        self.first[games] = (self.first[games] - 1) % self.capacity
+        self.cells[games, self.first[games]] = head
+        self.occupy(games, head)
+
+        eating = head == self.apple[games]
+        if eating.any():
+            self.add(games[eating])
+            self.spawn_apples(games[eating])
+        return eating
+
+    def add(self, games):
+        """Grow the snakes of the games by a segment behind the tail"""
+        tail = self.tail(games)
+        single = self.length[games] == 1
+        index = np.where(single, tail - self.offsets[self.heading[games]], 2 * tail - self.tail(games, 2))
+
+        self.cells[games, (self.first[games] + self.length[games]) % self.capacity] = index
+        self.length[games] += 1
+        self.occupy(games, index)
+
+    def in_bounds(self, games):
+        """Mask of the games whose head is on the board"""
+        x, y = self.cell(self.head(games))
+        return (0 <= x) & (x < self.columns) & (0 <= y) & (y < self.rows)
+
+    def is_collision(self, games):
+        """Mask of the games whose head shares its cell with another segment"""
+        return self.counts[games, self.head(games)] > 1
+
+    def sensor_inputs(self, games):
+        """Network inputs of the games, the outputs of every sensor block in order"""
+        blocks = {"rays": self.sensor_data, "apple": self.apple_data}
+        return np.concatenate([blocks[block](games) for block in self.blocks], axis=1)
+
+    def sensor_data(self, games):
+        """The 24 ray sensor outputs of the games, the table ray march of RaySensors run on every game at once"""
+        rays = ray_arrays(self.width, self.height, self.size)
+        columns, rows = self.columns, self.rows
+        count = len(games)
+        counts = self.counts[games].reshape(count, rows + 2, self.stride)
+
+        # Segments with each lattice point as one of their 4 corners, cells past the margin are empty
+        padded = np.zeros((count, rows + 2, self.stride + 1), dtype=np.int64)
+        padded[:, :, :-1] = counts
+        corners = (padded[:, :-1, :-1] + padded[:, :-1, 1:] + padded[:, 1:, :-1] + padded[:, 1:, 1:]).reshape(count, -1)
+
+        head_x, head_y = self.cell(self.head(games))
+        apple_x, apple_y = self.cell(self.apple[games])
+        cell = head_y * columns + head_x
+        lattice = rays.lattice[cell]
+
+        # The first step where the corners and apple add up past the limit, the wall if there is none
+        total = np.take_along_axis(corners, lattice.reshape(count, -1), axis=1).reshape(lattice.shape)
+        total += lattice == (apple_y * (columns + 2) + apple_x)[:, None, None]
+        step = np.argmax(total > rays.limit[cell], axis=2)[..., None]
+        distance = np.take_along_axis(rays.distance[cell], step, axis=2)[..., 0]
+        valid = np.take_along_axis(rays.valid[cell], step, axis=2)[..., 0]
+        left, top, right, bottom = np.moveaxis(np.take_along_axis(rays.range[cell], step[..., None], axis=2)[:, :, 0], 2, 0)
+
+        apple = valid & (left <= apple_x[:, None]) & (apple_x[:, None] <= right) & \
+            (top <= apple_y[:, None]) & (apple_y[:, None] <= bottom)
+
+        # Segments in the cell range from a summed area table, the head counts once if it is in range
+        area = np.zeros((count, rows + 3, self.stride + 1), dtype=np.int64)
+        area[:, 1:, 1:] = counts.cumsum(axis=1).cumsum(axis=2)
+        games_axis = np.arange(count)[:, None]
+        segments = area[games_axis, bottom + 2, right + 2] - area[games_axis, top + 1, right + 2] - \
+            area[games_axis, bottom + 2, left + 1] + area[games_axis, top + 1, left + 1]
+        segments -= (left <= head_x[:, None]) & (head_x[:, None] <= right) & \
+            (top <= head_y[:, None]) & (head_y[:, None] <= bottom)
+        body = valid & (segments > 0)
+
+        return np.stack((distance, apple, body), axis=2).reshape(count, 24).astype(float)
+
+    def apple_data(self, games):
+        """Whether the apple lies north, west, south or east of the head, for each game"""
+        head_x, head_y = self.cell(self.head(games))
+        apple_x, apple_y = self.cell(self.apple[games])
+        return np.stack((apple_y < head_y, apple_x < head_x, apple_y > head_y, apple_x > head_x), axis=1).astype(float)
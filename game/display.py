@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+
+# pygame is only imported and initialized once something is rendered, headless training never loads it
+_pygame = None
+_screen = None
+
+def load_pygame():
+    """Import and initialize pygame, once per process"""
+    global _pygame
+    if _pygame is None:
+        import pygame
+        pygame.init()
+        _pygame = pygame
+    return _pygame
+
+def get_screen(width: int, height: int):
+    """Display surface of the process, reused across games of the same size"""
+    global _screen
+    pygame = load_pygame()
+    if _screen is None or _screen.get_size() != (width, height):
+        _screen = pygame.display.set_mode((width, height))
+    return _screen
+
+def close_display():
+    """Shut pygame down, it is initialized again on the next use"""
+    global _pygame, _screen
+    if _pygame is not None:
+        _pygame.quit()
+    _pygame = None
+    _screen = None
+    _fonts.clear()
+    _glyphs.clear()
+
+# Fonts and rendered text by size, text and color
+_fonts = {}
+_glyphs = {}
+
+def get_font(size: int):
+    """Default font at a size, loaded once"""
+    font = _fonts.get(size)
+    if font is None:
+        pygame = load_pygame()
+        font = _fonts[size] = pygame.font.Font(pygame.font.get_default_font(), size)
+    return font
+
+def glyph(text: str, color: tuple[int, int, int], size: int = 25):
+    """Rendered text surface, cached since the same few letters and numbers are drawn every frame"""
+    key = (text, color, size)
+    surface = _glyphs.get(key)
+    if surface is None:
+        surface = _glyphs[key] = get_font(size).render(text, False, color, None)
+    return surface
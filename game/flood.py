@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+
+from collections import deque
+import heapq
+
+# Ring of the 8 cells around a cell, clockwise from north, as (x, y) steps
+RING = [(0, -1), (1, -1), (1, 0), (1, 1), (0, 1), (-1, 1), (-1, 0), (-1, -1)]
+
+class FloodFill:
+    """Connected regions of the free cells, kept up to date as the occupancy changes"""
+
+    def __init__(self, occupancy):
+        self.occupancy = occupancy
+        stride = occupancy.stride
+        self.neighbors = (-stride, -1, stride, 1)
+        self.ring = [y * stride + x for x, y in RING]
+
+        # Region label of every free board cell, 0 for occupied and margin cells
+        self.labels = [0] * len(occupancy.counts)
+        self.sizes = {}
+        self.next_label = 1
+        self.splits = 0
+
+        occupancy.regions = self
+        self.rebuild()
+
+    def detach(self):
+        """Stop following the occupancy"""
+        self.occupancy.regions = None
+
+    def rebuild(self):
+        """Label every region from scratch"""
+        labels = self.labels
+        for i in range(len(labels)):
+            labels[i] = 0
+        self.sizes = {}
+
+        for index in self.occupancy.free:
+            if labels[index] == 0:
+                self.label_region(index, 0, self.new_label())
+
+    def new_label(self) -> int:
+        label = self.next_label
+        self.next_label += 1
+        self.sizes[label] = 0
+        return label
+
+    def label_region(self, start: int, old: int, new: int):
+        """Relabel the cells labelled old that connect to start"""
+        labels = self.labels
+        labels[start] = new
+        queue = deque([start])
+        size = 0
+
+        while queue:
+            index = queue.popleft()
+            size += 1
+            for offset in self.neighbors:
+                neighbor = index + offset
+                if labels[neighbor] == old and labels[neighbor] != new and (old or self.free_cell(neighbor)):
+                    labels[neighbor] = new
+                    queue.append(neighbor)
+        self.sizes[new] += size
+        return size
+
+    def free_cell(self, index: int) -> bool:
+        """Verify a cell is a free board cell"""
+        occupancy = self.occupancy
+        return occupancy.counts[index] == 0 and occupancy.on_board(*occupancy.cell(index))
+
+    def free(self, index: int):
+        """A board cell was vacated, merge the regions around it into the largest one"""
+        labels = self.labels
+        around = {labels[index + offset] for offset in self.neighbors} - {0}
+
+        if not around:
+            label = self.new_label()
+        else:
+            # Relabelling the smaller regions keeps the merge cost to the cells that change label
+            label = max(around, key=self.sizes.get)
+            for other in around - {label}:
+                start = next(index + offset for offset in self.neighbors if labels[index + offset] == other)
+                self.label_region(start, other, label)
+                del self.sizes[other]
+
+        labels[index] = label
+        self.sizes[label] += 1
+
+    def fill(self, index: int):
+        """A board cell was taken, split its region if it was the only link between parts of it"""
+        labels = self.labels
+        label = labels[index]
+        if label == 0:
+            return
+        labels[index] = 0
+        self.sizes[label] -= 1
+        if self.sizes[label] == 0:
+            del self.sizes[label]
+            return
+
+        # Free runs of the ring around the cell, only runs holding a side neighbor can come apart
+        ring = [labels[index + offset] != 0 for offset in self.ring]
+        starts = [i for i in range(8) if ring[i] and not ring[i - 1]]
+        if not starts:
+            return
+        runs = []
+        for start in starts:
+            sides = []
+            i = start
+            while ring[i % 8] and len(sides) < 8:
+                if i % 2 == 0:
+                    sides.append(index + self.ring[i % 8])
+                i += 1
+            if sides:
+                runs.append(sides[0])
+        if len(runs) > 1:
+            self.split(label, runs)
+
+    def split(self, label: int, seeds: list[int]):
+        """Search from every seed in turn until only one search is still growing, relabelling the finished ones"""
+        labels = self.labels
+        owner = {seed: i for i, seed in enumerate(seeds)}
+        group = list(range(len(seeds)))
+        frontiers = [deque([seed]) for seed in seeds]
+        visited = [[seed] for seed in seeds]
+
+        def find(i):
+            while group[i] != i:
+                i = group[i]
+            return i
+
+        while True:
+            active = {find(i) for i in range(len(seeds)) if frontiers[i]}
+            if len(active) <= 1:
+                break
+
+            for i, frontier in enumerate(frontiers):
+                if not frontier:
+                    continue
+                index = frontier.popleft()
+                for offset in self.neighbors:
+                    neighbor = index + offset
+                    if labels[neighbor] != label:
+                        continue
+                    other = owner.get(neighbor)
+                    if other is None:
+                        owner[neighbor] = i
+                        visited[i].append(neighbor)
+                        frontier.append(neighbor)
+                    elif find(other) != find(i):
+                        # Two searches met, they are in the same region
+                        group[find(other)] = find(i)
+
+        # Searches that finished apart from the one still growing are regions of their own
+        groups = {}
+        for i in range(len(seeds)):
+            groups.setdefault(find(i), []).append(i)
+        finished = [members for root, members in groups.items() if root not in active]
+        if not active:
+            finished.remove(max(finished, key=lambda members: sum(len(visited[i]) for i in members)))
+
+        for members in finished:
+            new = self.new_label()
+            for i in members:
+                for index in visited[i]:
+                    labels[index] = new
+            self.sizes[new] = sum(len(visited[i]) for i in members)
+            self.sizes[label] -= self.sizes[new]
+            self.splits += 1
+
+    def region_size(self, index: int) -> int:
+        """Free cells in the region of a cell, 0 if the cell is not free"""
+        label = self.labels[index]
+        return self.sizes[label] if label else 0
+
+    def reachable(self, index: int) -> set[int]:
+        """Labels of the regions next to a cell"""
+        return {self.labels[index + offset] for offset in self.neighbors} - {0}
+
+    def path_length(self, start: int, goal: int, limit: int):
+        """Shortest path length from start to goal over free cells, None if the search goes past limit cells"""
+        labels = self.labels
+        stride = self.occupancy.stride
+        goal_y, goal_x = divmod(goal, stride)
+
+        def estimate(index):
+            y, x = divmod(index, stride)
+            return abs(x - goal_x) + abs(y - goal_y)
+
+        # Ties go to the deepest cell so open boards expand little more than the path itself
+        distances = {start: 0}
+        queue = [(estimate(start), 0, start)]
+        expanded = 0
+        while queue and expanded < limit:
+            _, distance, index = heapq.heappop(queue)
+            distance = -distance
+            if index == goal:
+                return distance
+            if distance > distances[index]:
+                continue
+            expanded += 1
+            for offset in self.neighbors:
+                neighbor = index + offset
+                if (labels[neighbor] or neighbor == goal) and distance + 1 < distances.get(neighbor, distance + 2):
+                    distances[neighbor] = distance + 1
+                    heapq.heappush(queue, (distance + 1 + estimate(neighbor), -distance - 1, neighbor))
+        return None
@@ -1,28 +1,37 @@
 #!/usr/bin/env python3
 
 import pygame
-import math
-import random
 
 from components.entity import Entity
-from components.snake import Snake
 from components.utils import Action, Direction
+from game.display import close_display, get_font, load_pygame
+from game.renderer import Renderer
+from game.simulation import Simulation
+
+from collections import deque
 
 v = pygame.Vector2
 
-class Game:
-    def __init__(self, surface: pygame.Surface, head: Entity, body_color: tuple[int, int, int], fps: int = 12):
+# Player keys, presses wait in a short queue and are taken one per step, presses past a full queue are ignored
+KEYS = {pygame.K_w: Action.STRAIGHT, pygame.K_a: Action.LEFT, pygame.K_d: Action.RIGHT}
+INPUT_BUFFER = 3
+
+# Steps run in one frame at most before the game gives up catching up
+MAX_CATCHUP = 5
+
+class Game(Simulation):
+    """Renders a simulation onto a pygame surface"""
+
+    def __init__(self, surface: pygame.Surface, head: Entity, body_color: tuple[int, int, int], fps: int = 12, seed: int = None):
+        super().__init__(surface.get_width(), surface.get_height(), head, body_color, seed)
         self.surface = surface
-        self.snake = Snake(head, body_color)
-        self.size = head.size
         self.clock = pygame.time.Clock()
         self.fps = fps
-        self.board = self.generate_cells()
-        self.apple = self.spawn_apple()
         self.vectors = self.board_vectors()
-        self.sensors = self.generate_sensors(self.snake.head.position())
+        self.sensors = self.generate_sensors(self.snake.head_position())
 
-        pygame.init()
+        load_pygame()
+        self.renderer = Renderer(surface, self.size, self.snake.head_color, self.snake.body_color, self.apple.color)
 
     def board_vectors(self):
         """Creates vectors surrounding the board of the game"""
@@ -63,161 +72,6 @@ class Game:
         # Line does not intersect
         return False
 
-    def generate_sensors(self, point) -> tuple[list[v], list[int]]:
-        """Generate vectors from a point to the screen"""
-        # Distances 8 directions
-        distances = self.calculate_sensor_length(point)
-
-        # Vectors for those distances
-        vectors = []
-
-        for i in range(0, 8):
-            angle = 45 * i
-            if i == 0 or i == 4:
-                vector = v(distances[i], 0)
-            elif i == 1 or i == 5:
-                vector = v(0, -distances[i])
-            elif i == 2 or i == 6:
-                vector = v(-distances[i], 0)
-            elif i == 3 or i == 7:
-                vector = v(0, distances[i])
-            vector.rotate_ip(angle)
-            vector += point
-            vectors.append(vector)
-        return (vectors, distances)
-
-    def sensor_data(self, point):
-        """Generate the 24 sensor outputs"""
-        sensors, distances = self.generate_sensors(point)
-        apple_data = []
-        entity_data = [0] * 8
-
-        for i, sensor in enumerate(sensors):
-            # Check if sensors collide with apple
-            apple_data.append(int(pygame.draw.line(self.surface, (0, 0, 255), point, sensor, 1)
-                              .colliderect((self.apple.x, self.apple.y, self.size, self.size))))
-
-            for entity in self.snake.body:
-                # Check if sensors intersect the snake body
-                if entity != self.snake.head:
-                    if pygame.draw.line(self.surface, (0, 0, 255), point, sensor).colliderect(
-                            (entity.x, entity.y, self.size, self.size)):
-                        entity_data[i] = 1
-                        continue
-
-        # Combine data and flatten
-        output = list(zip(distances, apple_data, entity_data))
-        return [element for sensor_point in output for element in sensor_point]
-
-    def distance(self, start, end):
-        return math.sqrt((end[1] - start[1])**2 + (end[0] - start[0])**2)
-
-    def calculate_wall_distances(self, point) -> list[int]:
-        """Calculate the ditances between the point and the screen in 8 directions"""
-        x, y = point
-        width, height = self.surface.get_width(), self.surface.get_height()
-        distances = []
-
-        # Calculate distance to edges
-        distances.append(width - x)
-        distances.append(math.sqrt((width - x - self.size)**2 + y**2))
-        distances.append(y)
-        distances.append(math.sqrt(x**2 + y**2))
-        distances.append(x)
-        distances.append(math.sqrt(x**2 + (height - y - self.size)**2))
-        distances.append(height - y)
-        distances.append(math.sqrt((width - x - self.size)**2 + (height - y - self.size)**2) + self.size)
-
-        # Round distances
-        distances = [math.ceil(distance) for distance in distances]
-
-        return distances
-
-    def calculate_sensor_length(self, point):
-        # print("Calculate senor length point:", point)
-        # print("HEAD POINT:", self.snake.head.position())
-        # Distances to the walls from the current point
-        wall_distances = self.calculate_wall_distances(point)
-        # Distances to entity objects from the current point
-        entity_collisions = self.calculate_entity_collision_points(point)
-
-        entity_distances = [
-            min([self.distance(point, collision) for collision in sensor], default=wall_distances[i])
-            for i, sensor in enumerate(entity_collisions)
-        ]
-
-        return entity_distances
-
-    def calculate_entity_collision_points(self, point) -> list[int]:
-        """Calculate the collision points between the sensors and the body/apple"""
-        x, y = point
-        closest_points = [[] for _ in range(8)]
-
-        # Get snake permissions without head
-        positions = self.snake.all_positions()
-        positions.append(self.apple.position())
-        try:
-            positions.remove(self.snake.head.position())
-        except ValueError:
-            pass
-
-        # 0 degrees collision
-        for x in range(int(point[0]), self.surface.get_width(), self.size):
-            if (x, point[1]) in positions:
-                closest_points[0].append((x, point[1]))
-        x, y = point
-
-        # 45 degrees collision
-        while x > 0 and y > 0:
-            if (x, y) in positions:
-                closest_points[1].append((x, y))
-            x += self.size
-            y -= self.size
-        x, y = point
-
-        # 90 degrees collision
-        for y in range(int(point[1]), 0, -self.size):
-            if (point[0], y) in positions:
-                closest_points[2].append((point[0], y))
-        x, y = point
-
-        # 135 degrees collision
-        while x > 0 and y > 0:
-            if (x, y) in positions:
-                closest_points[3].append((x, y))
-            x -= self.size
-            y -= self.size
-        x, y = point
-
-        # 180 degrees collision
-        for x in range(int(point[0]), 0, -self.size):
-            if (x, point[1]) in positions:
-                closest_points[4].append((x, point[1]))
-        x, y = point
-
-        # 225 degrees collision
-        while x > 0 and y < self.surface.get_height():
-            if (x, y) in positions:
-                closest_points[5].append((x, y))
-            x -= self.size
-            y += self.size
-        x, y = point
-
-        # 270 degrees collision
-        for y in range(int(point[1]), self.surface.get_height(), self.size):
-            if (point[0], y) in positions:
-                closest_points[6].append((point[0], y))
-        x, y = point
-
-        # 315 degrees collision
-        while x < self.surface.get_width() and y < self.surface.get_height():
-            if (x, y) in positions:
-                closest_points[7].append((x, y))
-            x += self.size
-            y += self.size
-
-        return closest_points
-
     def render_vectors(self, screen, point):
         points, _ = self.generate_sensors(point)
         for vector in points:
@@ -242,95 +96,132 @@ class Game:
         # Intersection vector
         return v(intersection_x, intersection_y)
 
-    def generate_cells(self):
-        """Generate the cell positions for the board"""
-        board = []
-
-        # Iterate through each position
-        for col in range(0, self.surface.get_height() // self.size):
-            for row in range(0, self.surface.get_width() // self.size):
-                board.append((col * self.size, row * self.size))
-        return board
-
-    def in_bounds(self):
-        """Verify the snake head is in bounds"""
-        x, y = self.snake.head.position()
-        width, height = self.surface.get_width(), self.surface.get_height()
-        return 0 <= x < width and 0 <= y < height
-
-    def available_positions(self):
-        """Generate all positions not taken by the snake"""
-        snake_pos = self.snake.positions()
-        available = [position for position in self.board if position not in snake_pos]
-        return available
-
-    def spawn_apple(self):
-        """Spawn an apple in one of the available screen positions"""
-        available = self.available_positions()
-        x, y = available[random.randrange(0, len(available))]
-        return Entity(x, y, self.size, (255, 0, 0))
-
     def draw_apple(self):
         """Render the apple to the screen"""
         pygame.draw.rect(self.surface, self.apple.color, (self.apple.x, self.apple.y, self.apple.size, self.apple.size))
 
-    def play(self):
-        """Human interaction"""
+    def poll_events(self):
+        """Handle window events, returns False once the window is closed"""
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                return False
+        return True
+
+    def render(self):
+        """Render the cells that changed, waiting for the next frame"""
+        rects = self.renderer.draw(self, update=False)
+
+        self.clock.tick(self.fps)
+        pygame.display.update(rects)
+
+    def tick(self, action: Action):
+        """Advance the game one step with a player action"""
+        self.snake.move(action)
+
+        if self.snake.is_eating(self.apple):
+            # If snake collides with apple, spawn new apple and add to snake
+            self.snake.add()
+            self.apple = self.spawn_apple()
+
+        if self.snake.is_collision() or not self.in_bounds():
+            # If snake collides with itself, reset
+            self.snake.reset()
+            self.apple = self.spawn_apple()
+
+    def play(self, step_rate: float = None, render_fps: int = 60, debug: bool = False, debug_rate: float = 4.0):
+        """Human interaction, the snake moves at a fixed rate while input and drawing run at the render rate"""
+        step = 1000.0 / (step_rate or self.fps)
+        actions = deque()
+        overlay = DebugOverlay(self, debug_rate) if debug else None
+
+        self.renderer.invalidate()
+        self.renderer.draw(self)
+        self.clock.tick()
+
         running = True
         pause = False
+        lag = 0.0
         while running:
+            # Every key press is queued, so turns made between two steps are not lost
             for event in pygame.event.get():
                 if event.type == pygame.QUIT:
                     running = False
-                    break
                 elif event.type == pygame.KEYDOWN:
                     if event.key == pygame.K_p:
                         pause = not pause
-
-            # Paint the screen black
-            self.surface.fill("black")
-
-            # Determine action from key pressed
-            action = Action.NONE
-            if not pause:
-                keys = pygame.key.get_pressed()
-                if keys[pygame.K_w]:
-                    action = Action.STRAIGHT
-                elif keys[pygame.K_a]:
-                    action = Action.LEFT
-                elif keys[pygame.K_d]:
-                    action = Action.RIGHT
-
-            if not pause:
-                # Set the action on the snake
-                self.snake.move(action)
-
-                if self.snake.is_eating(self.apple):
-                    # If snake collides with apple, spawn new apple and add to snake
-                    self.snake.add()
-                    self.apple = self.spawn_apple()
-
-                if self.snake.is_collision() or not self.in_bounds():
-                    # If snake collides with itself, reset
-                    self.snake.reset()
-                    self.apple = self.spawn_apple()
-
-                # Render the game
-                self.snake.draw(self.surface)
-                self.draw_apple()
-
-                # self.render_vectors(self.surface, v(self.snake.head.x, self.snake.head.y))
-
-                # Update the sensors
-                # print("HEAD POINT:", self.snake.head.position())
-                print("Sensors:", self.sensor_data(self.snake.head.position()))
-
-                # Update game
-                pygame.display.update()
-                self.clock.tick(12)
+                        actions.clear()
+                    elif event.key in KEYS and not pause and len(actions) < INPUT_BUFFER:
+                        actions.append(KEYS[event.key])
+
+            elapsed = self.clock.tick(render_fps)
+            lag = 0.0 if pause else lag + elapsed
+
+            # Fixed steps catch up with the time that passed, after a long stall the rest is dropped
+            steps = 0
+            while lag >= step and steps < MAX_CATCHUP:
+                self.tick(actions.popleft() if actions else Action.NONE)
+                lag -= step
+                steps += 1
+            if steps == MAX_CATCHUP:
+                lag = 0.0
+
+            rects = self.renderer.draw(self, update=False) if steps else []
+            if overlay is not None:
+                rects.extend(overlay.draw(self.surface, self.renderer, redraw=bool(rects)))
+            if rects:
+                pygame.display.update(rects)
 
         # Game has been exited
-        pygame.quit()
+        close_display()
+
+class DebugOverlay:
+    """Sensor readout drawn over the board, refreshed a few times a second instead of every step"""
+
+    def __init__(self, game: Game, rate: float = 4.0, size: int = 14, color: tuple[int, int, int] = (0, 128, 255)):
+        self.game = game
+        self.interval = 1000.0 / rate
+        self.font = get_font(size)
+        self.color = color
+        self.due = 0
+        self.text = None
+        self.rect = None
+
+    def lines(self) -> list[str]:
+        game = self.game
+        inputs = game.sensor_inputs(game.snake.head_position())
+        lines = [f"{game.clock.get_fps():.0f} fps  length {game.snake.length}"]
+        for i in range(0, len(inputs), 8):
+            lines.append(" ".join(f"{value:.2f}" for value in inputs[i:i + 8]))
+        return lines
+
+    def refresh(self):
+        """Compute the sensors and render them as text"""
+        lines = [self.font.render(line, False, self.color) for line in self.lines()]
+        width = max(line.get_width() for line in lines)
+        height = sum(line.get_height() for line in lines)
+        self.text = pygame.Surface((width, height), pygame.SRCALPHA)
+        y = 0
+        for line in lines:
+            self.text.blit(line, (0, y))
+            y += line.get_height()
+
+    def draw(self, surface, renderer: Renderer, redraw: bool) -> list:
+        """Draw the overlay if it changed or the board under it was drawn, returns the rects that changed"""
+        rects = []
+        now = pygame.time.get_ticks()
+        if now >= self.due:
+            self.due = now + self.interval
+            self.refresh()
+
+            # Cells under the old text are drawn again before the new text goes over them
+            if self.rect is not None:
+                rects.append(renderer.repaint(self.game, self.rect))
+            redraw = True
+
+        if redraw:
+            self.rect = surface.blit(self.text, (4, 4))
+            rects.append(self.rect)
+        return rects
 
 # width, height = 800, 800
 # screen = pygame.display.set_mode((width, height))
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+
+from game.display import load_pygame
+
+BACKGROUND = (0, 0, 0)
+
+class Renderer:
+    """Redraws only the cells that changed since the last frame: new head, old head, vacated tail and apple"""
+
+    def __init__(self, surface, size: int, head_color: tuple[int, int, int], body_color: tuple[int, int, int],
+                 apple_color: tuple[int, int, int], background: tuple[int, int, int] = BACKGROUND):
+        self.pygame = load_pygame()
+        self.surface = surface
+        self.size = size
+        self.background = background
+
+        # One cell sized tile per kind of cell, blitted instead of drawing rects
+        self.tiles = {}
+        for kind, color in (("head", head_color), ("body", body_color), ("apple", apple_color), ("empty", background)):
+            tile = self.pygame.Surface((size, size))
+            tile.fill(color)
+            self.tiles[kind] = tile.convert() if self.pygame.display.get_surface() is not None else tile
+
+        # What was drawn last frame
+        self.head = None
+        self.tail = None
+        self.length = 0
+        self.apple = None
+
+    def invalidate(self):
+        """Repaint everything on the next frame"""
+        self.head = None
+
+    def kind(self, snake, index: int, position, apple) -> str:
+        """Tile drawn at a cell, the apple is drawn over the snake"""
+        if position == apple:
+            return "apple"
+        if index == snake.cells[0]:
+            return "head"
+        if snake.occupancy.counts[index] > 0:
+            return "body"
+        return "empty"
+
+    def draw(self, game, update: bool = True) -> list:
+        """Draw the game onto the surface, returns the rects that changed"""
+        snake = game.snake
+        cells = snake.cells
+        apple = game.apple.position()
+
+        # Only a single step since the last frame can be drawn incrementally, resets and skipped frames repaint all
+        incremental = self.head is not None and snake.length >= self.length and \
+            (self.head == cells[0] or (snake.length > 1 and self.head == cells[1]) or snake.length == 1)
+
+        if incremental:
+            changed = {cells[0], cells[-1], self.head, self.tail}
+            rects = [self.draw_cell(snake, index, apple) for index in changed]
+            if apple != self.apple:
+                rects.append(self.draw_position(snake, self.apple, apple))
+                rects.append(self.draw_position(snake, apple, apple))
+        else:
+            rects = [self.surface.fill(self.background)]
+            for index in cells:
+                self.draw_cell(snake, index, apple)
+            self.draw_position(snake, apple, apple)
+
+        self.head = cells[0]
+        self.tail = cells[-1]
+        self.length = snake.length
+        self.apple = apple
+
+        if update:
+            self.pygame.display.update(rects)
+        return rects
+
+    def repaint(self, game, rect):
+        """Redraw the cells within a rect, such as the area under an overlay"""
+        snake = game.snake
+        apple = game.apple.position()
+        rect = self.surface.fill(self.background, rect)
+        for index in snake.cells:
+            x, y = snake.position(index)
+            if rect.colliderect((x, y, self.size, self.size)):
+                self.draw_cell(snake, index, apple)
+        if rect.colliderect((apple[0], apple[1], self.size, self.size)):
+            self.draw_position(snake, apple, apple)
+        return rect
+
+    def draw_cell(self, snake, index: int, apple):
+        """Blit the tile of an occupancy index"""
+        position = snake.position(index)
+        return self.surface.blit(self.tiles[self.kind(snake, index, position, apple)], position)
+
+    def draw_position(self, snake, position, apple):
+        """Blit the tile of a screen position"""
+        return self.draw_cell(snake, snake.cell(*position), apple)
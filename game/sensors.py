@@ -0,0 +1,331 @@
+#!/usr/bin/env python3
+
+import math
+
+# Vectors of the 8 sensors before sensor i is rotated by 45 * i degrees, counter clockwise starting east
+SENSOR_VECTORS = [(1, 0), (0, -1), (-1, 0), (0, 1)] * 2
+
+# Cell steps of the 8 sensors
+SENSOR_STEPS = [(1, 0), (1, -1), (0, -1), (-1, -1), (-1, 0), (-1, 1), (0, 1), (1, 1)]
+
+# Inputs of each sensor block, networks take a combination of blocks matching their num_inputs
+SENSOR_BLOCKS = {"rays": 24, "flood": 7, "apple": 4}
+BLOCK_COMBINATIONS = [("rays",), ("rays", "flood"), ("rays", "apple"), ("rays", "flood", "apple"), ("flood", "apple"),
+                      ("flood",), ("apple",)]
+
+def sensor_end(point, sensor: int, distance: float) -> tuple[float, float]:
+    """End point of a sensor line, rotated with the same floating point steps as pygame's Vector2.rotate"""
+    x, y = SENSOR_VECTORS[sensor]
+    x, y = x * distance, y * distance
+    angle = 45 * sensor % 360
+
+    # Quarter turns are exact, the diagonals use sin and cos separately so their ends can fall just short of a pixel
+    if angle == 90:
+        x, y = -y, x
+    elif angle == 180:
+        x, y = -x, -y
+    elif angle == 270:
+        x, y = y, -x
+    elif angle != 0:
+        radians = angle * math.pi / 180.0
+        sin, cos = math.sin(radians), math.cos(radians)
+        x, y = cos * x - sin * y, sin * x + cos * y
+    return (point[0] + x, point[1] + y)
+
+def sensor_blocks(num_inputs: int) -> tuple[str, ...]:
+    """Sensor blocks that make up num_inputs inputs"""
+    for blocks in BLOCK_COMBINATIONS:
+        if sum(SENSOR_BLOCKS[block] for block in blocks) == num_inputs:
+            return blocks
+    raise ValueError(f"No sensor blocks make up {num_inputs} inputs, block sizes are {SENSOR_BLOCKS}")
+
+# Sensor tables of every board size built in this process, shared by all its games
+_TABLES = {}
+
+def sensor_table(width: int, height: int, size: int):
+    """Sensor table of a board size, built on first use"""
+    key = (width, height, size)
+    table = _TABLES.get(key)
+    if table is None:
+        table = _TABLES[key] = SensorTable(RaySensors(width, height, size, tables=False))
+    return table
+
+class SensorTable:
+    """Per cell sensor geometry, everything about the rays that does not depend on the snake or apple"""
+
+    def __init__(self, sensors):
+        self.columns = sensors.columns
+        self.rows = sensors.rows
+        self.walls = []
+        self.rays = []
+        self.wall_ranges = []
+
+        size = sensors.size
+        for row in range(self.rows):
+            for column in range(self.columns):
+                point = (column * size, row * size)
+                walls = sensors.wall_distances(point)
+                rays = []
+                wall_ranges = []
+
+                for i, length in enumerate(sensors.ray_lengths(column, row)):
+                    # Lattice point, distance and cell range of the sensor line ending there, for each step
+                    step_x, step_y = SENSOR_STEPS[i]
+                    ray = []
+                    for k in range(length):
+                        distance = math.sqrt((k * size * step_y)**2 + (k * size * step_x)**2)
+                        ray.append((column + k * step_x, row + k * step_y, distance, sensors.end_range(point, i, distance)))
+                    rays.append(ray)
+                    wall_ranges.append(sensors.end_range(point, i, walls[i]))
+
+                self.walls.append(walls)
+                self.rays.append(rays)
+                self.wall_ranges.append(wall_ranges)
+
+    def index(self, column: int, row: int):
+        """Table index of a cell, None if it is off the board"""
+        if 0 <= column < self.columns and 0 <= row < self.rows:
+            return row * self.columns + column
+        return None
+
+class RaySensors:
+    """Marches the 8 sensor rays over the occupied cells of a board"""
+
+    def __init__(self, width: int, height: int, size: int, tables: bool = True):
+        self.width = width
+        self.height = height
+        self.size = size
+        self.columns = width // size
+        self.rows = height // size
+        self.tables = tables
+        self._table = None
+
+    @property
+    def table(self):
+        """Precomputed geometry of this board size"""
+        if self._table is None:
+            self._table = sensor_table(self.width, self.height, self.size)
+        return self._table
+
+    def ray_lengths(self, column: int, row: int) -> list[int]:
+        """Number of lattice points each ray visits from the corner of a cell"""
+        columns, rows = self.columns, self.rows
+
+        # The north east ray is only bounded by the top edge
+        return [
+            columns - column,
+            row if column > 0 else 0,
+            row,
+            min(column, row),
+            column,
+            min(column, rows - row),
+            rows - row,
+            min(columns - column, rows - row),
+        ]
+
+    def wall_distances(self, point) -> list[int]:
+        """Calculate the distances between the point and the screen in 8 directions"""
+        x, y = point
+        width, height, size = self.width, self.height, self.size
+
+        # Points on the cell grid are looked up
+        if self.tables and x % size == 0 and y % size == 0:
+            index = self.table.index(int(x // size), int(y // size))
+            if index is not None:
+                return list(self.table.walls[index])
+
+        distances = [
+            width - x,
+            math.sqrt((width - x - size)**2 + y**2),
+            y,
+            math.sqrt(x**2 + y**2),
+            x,
+            math.sqrt(x**2 + (height - y - size)**2),
+            height - y,
+            math.sqrt((width - x - size)**2 + (height - y - size)**2) + size,
+        ]
+        return [math.ceil(distance) for distance in distances]
+
+    def line_bounds(self, line_start, line_end):
+        """Bounding box of a one pixel line clipped to the board, as drawn by pygame"""
+        x1, y1 = int(line_start[0]), int(line_start[1])
+        x2, y2 = int(line_end[0]), int(line_end[1])
+        width, height = self.width, self.height
+
+        # Lines inside the board cover the box of their end points
+        if 0 <= x1 < width and 0 <= y1 < height and 0 <= x2 < width and 0 <= y2 < height:
+            return (min(x1, x2), min(y1, y2), abs(x2 - x1) + 1, abs(y2 - y1) + 1)
+
+        # pygame clips the end points to the board plus one pixel, rounding halves away from zero
+        dx, dy = x2 - x1, y2 - y1
+        t0, t1 = 0.0, 1.0
+        for p, q in ((-dx, x1), (dx, width - x1), (-dy, y1), (dy, height - y1)):
+            if p == 0:
+                if q < 0:
+                    return None
+            elif p < 0:
+                t0 = max(t0, q / p)
+            else:
+                t1 = min(t1, q / p)
+        if t0 > t1:
+            return None
+
+        def clipped(start, delta, t):
+            offset = delta * t
+            return start + int(offset - 0.5 if offset < 0 else offset + 0.5)
+
+        x1, y1, x2, y2 = clipped(x1, dx, t0), clipped(y1, dy, t0), clipped(x1, dx, t1), clipped(y1, dy, t1)
+
+        # It then draws the Bresenham pixels between them and keeps those on the board. The n-th pixel steps n times
+        # along the longer axis and ceil((n * shorter - length // 2) / length) times along the shorter one
+        dx, dy = abs(x2 - x1), abs(y2 - y1)
+        sx, sy = (1 if x2 > x1 else -1), (1 if y2 > y1 else -1)
+        length, shorter = max(dx, dy), min(dx, dy)
+        offset = length // 2
+
+        def pixel(n):
+            steps = -((offset - n * shorter) // length) if length else 0
+            if dx > dy:
+                return (x1 + sx * n, y1 + sy * steps)
+            return (x1 + sx * steps, y1 + sy * n)
+
+        def first(outside):
+            # Pixels only move one way along each axis, so once outside an edge the line stays there
+            low, high = 0, length + 1
+            while low < high:
+                middle = (low + high) // 2
+                if outside(pixel(middle)):
+                    high = middle
+                else:
+                    low = middle + 1
+            return low
+
+        # The clipped ends are at most one pixel past the right and bottom edges
+        if sx > 0:
+            enter, leave = 0, first(lambda p: p[0] >= width)
+        else:
+            enter, leave = first(lambda p: p[0] < width), length + 1
+        if sy > 0:
+            leave = min(leave, first(lambda p: p[1] >= height))
+        else:
+            enter = max(enter, first(lambda p: p[1] < height))
+        if enter >= leave:
+            return None
+
+        (ax, ay), (bx, by) = pixel(enter), pixel(leave - 1)
+        return (min(ax, bx), min(ay, by), abs(bx - ax) + 1, abs(by - ay) + 1)
+
+    def end_range(self, point, sensor: int, distance: float):
+        """Range of cells covered by a sensor line of the given length, None if it is off the board"""
+        bounds = self.line_bounds(point, sensor_end(point, sensor, distance))
+        if bounds is None:
+            return None
+        return self.cell_bounds(bounds)
+
+    def cell_bounds(self, bounds):
+        """Range of cells a bounding box overlaps"""
+        left, top, width, height = bounds
+        size = self.size
+        return (left // size, top // size, (left + width - 1) // size, (top + height - 1) // size)
+
+    def body_in_bounds(self, occupancy, head, bounds) -> bool:
+        """Verify if a body segment other than the head lies in the cell range"""
+        left, top, right, bottom = bounds
+
+        # Scan whichever is smaller, the cells in range or the occupied cells
+        if (right - left + 1) * (bottom - top + 1) <= len(occupancy.occupied):
+            for y in range(top, bottom + 1):
+                for x in range(left, right + 1):
+                    count = occupancy.count(x, y)
+                    if count > 1 or (count == 1 and (x, y) != head):
+                        return True
+            return False
+
+        for index in occupancy.occupied:
+            x, y = cell = occupancy.cell(index)
+            if left <= x <= right and top <= y <= bottom and (occupancy.counts[index] > 1 or cell != head):
+                return True
+        return False
+
+    def ray_distances(self, occupancy, head, apple, point) -> list[float]:
+        """Distance to the first body corner or apple along each ray, or to the wall"""
+        column, row = head
+        size = self.size
+        distances = self.wall_distances(point)
+
+        count = occupancy.count
+
+        def corners(x, y):
+            # Body segments that have (x, y) as one of their 4 corners, and the apple
+            total = count(x, y) + count(x - 1, y) + count(x, y - 1) + count(x - 1, y - 1)
+            if column in (x, x - 1) and row in (y, y - 1):
+                total -= 1
+            return total + ((x, y) == apple)
+
+        for i, length in enumerate(self.ray_lengths(column, row)):
+            step_x, step_y = SENSOR_STEPS[i]
+            x, y = column, row
+
+            for k in range(length):
+                # The head's own corner is discounted once
+                if corners(x, y) > (1 if k == 0 else 0):
+                    distances[i] = math.sqrt((k * size * step_y)**2 + (k * size * step_x)**2)
+                    break
+                x += step_x
+                y += step_y
+
+        return distances
+
+    def table_sensor_data(self, occupancy, head, apple, index) -> list:
+        """Generate the 24 sensor outputs with the ray geometry looked up from the sensor table"""
+        table = self.table
+        column, row = head
+        count = occupancy.count
+        output = []
+
+        for ray, distance, cells_range in zip(table.rays[index], table.walls[index], table.wall_ranges[index]):
+            for k, (x, y, ray_distance, ray_range) in enumerate(ray):
+                # Body segments that have (x, y) as one of their 4 corners and the apple, minus the head once
+                total = count(x, y) + count(x - 1, y) + count(x, y - 1) + count(x - 1, y - 1) + ((x, y) == apple)
+                if column in (x, x - 1) and row in (y, y - 1):
+                    total -= 1
+                if total > (1 if k == 0 else 0):
+                    distance, cells_range = ray_distance, ray_range
+                    break
+
+            apple_hit = 0
+            body_hit = 0
+            if cells_range is not None:
+                left, top, right, bottom = cells_range
+                apple_hit = int(left <= apple[0] <= right and top <= apple[1] <= bottom)
+                body_hit = int(self.body_in_bounds(occupancy, head, cells_range))
+            output.extend((distance, apple_hit, body_hit))
+
+        return output
+
+    def sensor_data(self, occupancy, head_position, apple_position) -> list:
+        """Generate the 24 sensor outputs from the occupied cells of the board"""
+        size = self.size
+        head = (head_position[0] // size, head_position[1] // size)
+        apple = (apple_position[0] // size, apple_position[1] // size)
+
+        # Heads on the cell grid of the board use the precomputed geometry
+        if self.tables and head_position == (head[0] * size, head[1] * size):
+            index = self.table.index(*head)
+            if index is not None:
+                return self.table_sensor_data(occupancy, head, apple, index)
+
+        distances = self.ray_distances(occupancy, head, apple, head_position)
+        output = []
+        for i, distance in enumerate(distances):
+            cells_range = self.end_range(head_position, i, distance)
+            apple_hit = 0
+            body_hit = 0
+
+            if cells_range is not None:
+                left, top, right, bottom = cells_range
+                apple_hit = int(left <= apple[0] <= right and top <= apple[1] <= bottom)
+                body_hit = int(self.body_in_bounds(occupancy, head, cells_range))
+            output.extend((distance, apple_hit, body_hit))
+
+        return output
@@ -0,0 +1,286 @@
+#!/usr/bin/env python3
+
+import math
+import random
+import struct
+
+from components.entity import Entity
+from components.occupancy import Occupancy
+from components.snake import Snake
+from components.utils import Direction, pack_actions, unpack_actions
+from game.flood import FloodFill
+from game.sensors import RaySensors, sensor_end
+
+# Board width and height, cell size, heading, length, head and apple cells, move budget, frames and apple seed
+SNAPSHOT = struct.Struct("<HHHbIIIiIQ")
+
+# Default seeds come from the OS so picking one never advances the global generator NEAT evolves with
+SEEDS = random.SystemRandom()
+
+class Simulation:
+    """Headless snake game that holds the board, snake and apple as pure state"""
+
+    def __init__(self, width: int, height: int, head: Entity, body_color: tuple[int, int, int], seed: int = None,
+                 blocks: tuple[str, ...] = ("rays",)):
+        # Pick a seed when none is given so every game can be replayed
+        if seed is None:
+            seed = SEEDS.getrandbits(63)
+        self.width = width
+        self.height = height
+        self.size = head.size
+        self.occupancy = Occupancy(width // self.size, height // self.size)
+        self.snake = Snake(head, body_color, self.occupancy)
+        self.seed = seed
+        self.random = random.Random(self.seed)
+        self.ray_sensors = RaySensors(width, height, self.size)
+        self.apple = self.spawn_apple()
+        self.flood = None
+        self.set_sensor_blocks(blocks)
+
+    def set_sensor_blocks(self, blocks: tuple[str, ...]):
+        """Choose the sensor blocks making up the network inputs, following the free regions if flood is used"""
+        self.blocks = tuple(blocks)
+        if "flood" in self.blocks and self.flood is None:
+            self.flood = FloodFill(self.occupancy)
+        elif "flood" not in self.blocks and self.flood is not None:
+            self.flood.detach()
+            self.flood = None
+
+    def reset(self, seed: int = None):
+        """Start a new game, reseeding the apple spawns"""
+        if seed is None:
+            seed = SEEDS.getrandbits(63)
+        self.seed = seed
+        self.snake.reset()
+        self.random.seed(seed)
+        self.apple = self.spawn_apple()
+
+    def snapshot(self, max_moves: int = 0, frames: int = 0) -> bytes:
+        """Compact byte snapshot of the game, the body is stored as 2 bit steps from the head"""
+        snake = self.snake
+        cells = snake.cells
+        steps = [snake.directions[cells[i - 1] - cells[i]].value for i in range(1, len(cells))]
+        heading = -1 if snake.heading is None else snake.heading
+
+        # Apples after a restore come from a seed derived from the game, the game's own generator is left alone
+        seed = (self.seed * 1000003 + frames) & (2**63 - 1)
+        apple = snake.cell(self.apple.x, self.apple.y)
+        header = SNAPSHOT.pack(self.width, self.height, self.size, heading, len(cells), cells[0], apple, max_moves,
+                               frames, seed)
+        return header + pack_actions(steps)
+
+    def restore(self, data: bytes) -> tuple[int, int]:
+        """Restore a snapshot of a game on the same board, returns its move budget and frames"""
+        width, height, size, heading, length, head, apple, max_moves, frames, seed = SNAPSHOT.unpack_from(data)
+        if (width, height, size) != (self.width, self.height, self.size):
+            raise ValueError(f"Snapshot of a {width}x{height} board with {size} cells does not fit this game")
+
+        offsets = self.snake.offsets
+        cells = [head]
+        for step in unpack_actions(data[SNAPSHOT.size:], length - 1):
+            cells.append(cells[-1] - offsets[step])
+        self.snake.restore(cells, None if heading < 0 else heading)
+
+        self.seed = seed
+        self.random.seed(seed)
+        x, y = self.occupancy.cell(apple)
+        self.apple = Entity(x * self.size, y * self.size, self.size, (255, 0, 0))
+        return max_moves, frames
+
+    def step(self, direction: Direction) -> bool:
+        """Move the snake one cell, returns True if the apple was eaten"""
+        self.snake.direction(direction)
+
+        if self.snake.is_eating(self.apple):
+            # If snake collides with apple, spawn new apple and add to snake
+            self.snake.add()
+            self.apple = self.spawn_apple()
+            return True
+        return False
+
+    def rect_collision(self, bounds, x, y):
+        """Determine collision between a bounding box and the cell at (x, y)"""
+        if bounds is None:
+            return False
+        left, top, width, height = bounds
+        return left < x + self.size and x < left + width and top < y + self.size and y < top + height
+
+    def generate_sensors(self, point) -> tuple[list[tuple[float, float]], list[int]]:
+        """Generate sensor end points from a point to the screen"""
+        # Distances 8 directions
+        distances = self.calculate_sensor_length(point)
+
+        # End points for those distances
+        end_points = [sensor_end(point, i, distance) for i, distance in enumerate(distances)]
+        return (end_points, distances)
+
+    def sensor_data(self, point):
+        """Generate the 24 sensor outputs by marching the rays over the occupied cells"""
+        return self.ray_sensors.sensor_data(self.occupancy, point, self.apple.position())
+
+    def sensor_inputs(self, point):
+        """Network inputs, the outputs of every sensor block in order"""
+        if self.blocks == ("rays",):
+            return self.sensor_data(point)
+
+        inputs = []
+        for block in self.blocks:
+            if block == "rays":
+                inputs.extend(self.sensor_data(point))
+            elif block == "flood":
+                inputs.extend(self.flood_data())
+            else:
+                inputs.extend(self.apple_data())
+        return inputs
+
+    def flood_data(self, limit: int = None):
+        """Area reachable through each neighbor of the head, total reachable area, apple reachable and path length"""
+        flood = self.flood
+        cells = self.occupancy.columns * self.occupancy.rows
+        head = self.snake.cells[0]
+        apple = self.snake.cell(self.apple.x, self.apple.y)
+
+        # Areas of the regions next to the head in Direction order, looked up from the region labels
+        areas = [flood.region_size(head + offset) / cells for offset in self.snake.offsets]
+        around = flood.reachable(head)
+        reachable = sum(flood.sizes[label] for label in around) / cells
+
+        # The path search is only run when the apple is known to be reachable and is capped at limit cells
+        distance = 0.0
+        reached = flood.labels[apple] in around
+        if reached:
+            length = flood.path_length(head, apple, limit or 4 * (self.occupancy.columns + self.occupancy.rows))
+            if length is None:
+                x, y = self.occupancy.cell(head)
+                apple_x, apple_y = self.occupancy.cell(apple)
+                length = abs(x - apple_x) + abs(y - apple_y)
+            distance = length / cells
+
+        return areas + [reachable, float(reached), distance]
+
+    def apple_data(self):
+        """Whether the apple lies north, west, south or east of the head"""
+        x, y = self.snake.head_position()
+        return [float(self.apple.y < y), float(self.apple.x < x), float(self.apple.y > y), float(self.apple.x > x)]
+
+    def line_sensor_data(self, point):
+        """Generate the 24 sensor outputs by intersecting sensor lines with every segment"""
+        sensors, distances = self.generate_sensors(point)
+        apple_data = []
+        entity_data = [0] * 8
+
+        for i, sensor in enumerate(sensors):
+            bounds = self.ray_sensors.line_bounds(point, sensor)
+
+            # Check if sensors collide with apple
+            apple_data.append(int(self.rect_collision(bounds, self.apple.x, self.apple.y)))
+
+            for entity in self.snake.body[1:]:
+                # Check if sensors intersect the snake body
+                if self.rect_collision(bounds, entity.x, entity.y):
+                    entity_data[i] = 1
+                    break
+
+        # Combine data and flatten
+        output = list(zip(distances, apple_data, entity_data))
+        return [element for sensor_point in output for element in sensor_point]
+
+    def distance(self, start, end):
+        return math.sqrt((end[1] - start[1])**2 + (end[0] - start[0])**2)
+
+    def calculate_wall_distances(self, point) -> list[int]:
+        """Calculate the ditances between the point and the screen in 8 directions"""
+        return self.ray_sensors.wall_distances(point)
+
+    def calculate_sensor_length(self, point):
+        # Distances to the walls from the current point
+        wall_distances = self.calculate_wall_distances(point)
+        # Distances to entity objects from the current point
+        entity_collisions = self.calculate_entity_collision_points(point)
+
+        entity_distances = [
+            min([self.distance(point, collision) for collision in sensor], default=wall_distances[i])
+            for i, sensor in enumerate(entity_collisions)
+        ]
+
+        return entity_distances
+
+    def calculate_entity_collision_points(self, point) -> list[int]:
+        """Calculate the collision points between the sensors and the body/apple"""
+        x, y = point
+        closest_points = [[] for _ in range(8)]
+
+        # Get snake permissions without head
+        positions = self.snake.all_positions()
+        positions.append(self.apple.position())
+        try:
+            positions.remove(self.snake.head_position())
+        except ValueError:
+            pass
+
+        # 0 degrees collision
+        for x in range(int(point[0]), self.width, self.size):
+            if (x, point[1]) in positions:
+                closest_points[0].append((x, point[1]))
+        x, y = point
+
+        # 45 degrees collision
+        while x > 0 and y > 0:
+            if (x, y) in positions:
+                closest_points[1].append((x, y))
+            x += self.size
+            y -= self.size
+        x, y = point
+
+        # 90 degrees collision
+        for y in range(int(point[1]), 0, -self.size):
+            if (point[0], y) in positions:
+                closest_points[2].append((point[0], y))
+        x, y = point
+
+        # 135 degrees collision
+        while x > 0 and y > 0:
+            if (x, y) in positions:
+                closest_points[3].append((x, y))
+            x -= self.size
+            y -= self.size
+        x, y = point
+
+        # 180 degrees collision
+        for x in range(int(point[0]), 0, -self.size):
+            if (x, point[1]) in positions:
+                closest_points[4].append((x, point[1]))
+        x, y = point
+
+        # 225 degrees collision
+        while x > 0 and y < self.height:
+            if (x, y) in positions:
+                closest_points[5].append((x, y))
+            x -= self.size
+            y += self.size
+        x, y = point
+
+        # 270 degrees collision
+        for y in range(int(point[1]), self.height, self.size):
+            if (point[0], y) in positions:
+                closest_points[6].append((point[0], y))
+        x, y = point
+
+        # 315 degrees collision
+        while x < self.width and y < self.height:
+            if (x, y) in positions:
+                closest_points[7].append((x, y))
+            x += self.size
+            y += self.size
+
+        return closest_points
+
+    def in_bounds(self):
+        """Verify the snake head is in bounds"""
+        x, y = self.snake.head_position()
+        return 0 <= x < self.width and 0 <= y < self.height
+
+    def spawn_apple(self):
+        """Spawn an apple in one of the available screen positions"""
+        x, y = self.occupancy.sample(self.random)
+        return Entity(x * self.size, y * self.size, self.size, (255, 0, 0))
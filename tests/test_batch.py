@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+
+from algorithm.evaluation import WIDTH, HEIGHT, create_batch, create_game
+from components.entity import Entity
+from components.utils import Direction
+from game.batch import BatchSimulation
+
+import numpy as np
+import random
+import pytest
+
+BLOCKS = ("rays", "apple")
+
+def choose_direction(game, rng: random.Random) -> Direction:
+    """Mostly safe moves towards the apple so the snakes grow, with the odd random one into a wall or the body"""
+    occupancy = game.occupancy
+    head = game.snake.cells[0]
+    safe = [direction for direction in Direction
+            if occupancy.on_board(*occupancy.cell(head + game.snake.offsets[direction.value]))
+            and occupancy.counts[head + game.snake.offsets[direction.value]] == 0]
+
+    (apple_x, apple_y), (x, y) = game.apple.position(), game.snake.head_position()
+    toward = {Direction.EAST: apple_x > x, Direction.WEST: apple_x < x, Direction.NORTH: apple_y < y,
+              Direction.SOUTH: apple_y > y}
+    closer = [direction for direction in safe if toward[direction]]
+
+    choice = rng.random()
+    if closer and choice < 0.7:
+        return rng.choice(closer)
+    if safe and choice < 0.995:
+        return rng.choice(safe)
+    return rng.choice(list(Direction))
+
+def test_batch_matches_simulation():
+    seeds = list(range(30))
+    batch = create_batch(seeds, BLOCKS)
+    games = [create_game(seed, BLOCKS) for seed in seeds]
+    rng = random.Random(0)
+    playing = np.arange(len(seeds))
+    eaten = 0
+
+    while len(playing):
+        inputs = batch.sensor_inputs(playing)
+        directions = []
+        for i, index in enumerate(playing.tolist()):
+            game = games[index]
+            assert inputs[i].tolist() == game.sensor_inputs(game.snake.head_position())
+            assert batch.positions(index) == game.snake.positions()
+            assert batch.apple_position(index) == game.apple.position()
+            directions.append(choose_direction(game, rng))
+
+        eating = batch.step(playing, np.array([direction.value for direction in directions]))
+        over = ~batch.in_bounds(playing) | batch.is_collision(playing)
+        for i, index in enumerate(playing.tolist()):
+            game = games[index]
+            assert game.step(directions[i]) == eating[i]
+            assert (not game.in_bounds() or game.snake.is_collision()) == over[i]
+            eaten += int(eating[i])
+        playing = playing[~over]
+
+    # Enough apples that growing and spawning were covered
+    assert eaten > 100
+
+def test_batch_rejects_flood():
+    with pytest.raises(ValueError):
+        BatchSimulation(2, WIDTH, HEIGHT, Entity(200, 200, 20, (0, 255, 0)), blocks=("rays", "flood"))
@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+
+from algorithm.network import evaluate_genomes, evaluate_genomes_lockstep
+from algorithm.parallel import PoolEvaluator
+from algorithm.racing import RacingEvaluator
+
+import contextlib
+import random
+import neat
+import io
+
+GENERATIONS = 4
+
+def load_config():
+    return neat.config.Config(neat.DefaultGenome, neat.DefaultReproduction, neat.DefaultSpeciesSet,
+                              neat.DefaultStagnation, "config/config-feedforward.txt")
+
+def evolve(fitness_function) -> list[list[float]]:
+    """Fitness of every genome in every generation of a seeded run"""
+    random.seed(123)
+    population = neat.Population(load_config())
+    fitnesses = []
+
+    def evaluate(genomes, config):
+        fitness_function(genomes, config)
+        fitnesses.append([genome.fitness for _, genome in sorted(genomes)])
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        population.run(evaluate, GENERATIONS)
+    return fitnesses
+
+def test_pool_matches_serial():
+    serial = evolve(lambda genomes, config: evaluate_genomes(genomes, config, seed=1))
+
+    evaluator = PoolEvaluator(2, seed=1)
+    try:
+        pool = evolve(evaluator.evaluate)
+    finally:
+        evaluator.close()
+    assert pool == serial
+
+def test_pool_racing_matches_serial():
+    serial = evolve(RacingEvaluator(4, seed=1).evaluate)
+
+    evaluator = PoolEvaluator(2, seed=1)
+    try:
+        pool = evolve(RacingEvaluator(4, seed=1, runner=evaluator.run_episodes).evaluate)
+    finally:
+        evaluator.close()
+    assert pool == serial
+
+def test_lockstep_matches_serial():
+    serial = evolve(lambda genomes, config: evaluate_genomes(genomes, config, seed=1))
+    lockstep = evolve(lambda genomes, config: evaluate_genomes_lockstep(genomes, config, seed=1))
+    assert lockstep == serial
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+
+from components.entity import Entity
+from game.sensors import RaySensors, SENSOR_STEPS
+from game.simulation import Simulation
+
+import random
+import pytest
+
+pygame = pytest.importorskip("pygame")
+
+SIZE = 20
+BOARDS = [(420, 420), (800, 600)]
+
+def pygame_sensor_data(game, point) -> list:
+    """Sensor outputs of the original game, Vector2 sensor lines drawn on a surface and tested against every rect"""
+    surface = pygame.Surface((game.width, game.height))
+    vectors = [(1, 0), (0, -1), (-1, 0), (0, 1)]
+    output = []
+
+    for i, distance in enumerate(game.calculate_sensor_length(point)):
+        x, y = vectors[i % 4]
+        sensor = pygame.Vector2(x * distance, y * distance)
+        sensor.rotate_ip(45 * i)
+        sensor += point
+        line = pygame.draw.line(surface, (255, 255, 255), point, sensor, 1)
+
+        apple = line.colliderect((game.apple.x, game.apple.y, SIZE, SIZE))
+        body = any(line.colliderect((x, y, SIZE, SIZE)) for x, y in game.snake.positions()[1:])
+        output.extend((distance, int(apple), int(body)))
+    return output
+
+def random_state(game, rng: random.Random):
+    """Put a random snake and apple on the board, apples often sit on a ray and heads near corners for long diagonals"""
+    occupancy = game.occupancy
+    columns, rows = occupancy.columns, occupancy.rows
+    if rng.random() < 0.3:
+        head = (rng.choice([0, 1, columns - 2, columns - 1]), rng.choice([0, 1, rows - 2, rows - 1]))
+    else:
+        head = (rng.randrange(columns), rng.randrange(rows))
+
+    # Self avoiding walk from the head
+    cells = [head]
+    for _ in range(rng.randrange(60)):
+        x, y = cells[-1]
+        steps = [(x + dx, y + dy) for dx, dy in ((1, 0), (-1, 0), (0, 1), (0, -1))]
+        steps = [cell for cell in steps if occupancy.on_board(*cell) and cell not in cells]
+        if not steps:
+            break
+        cells.append(rng.choice(steps))
+    game.snake.restore([occupancy.index(x, y) for x, y in cells], None)
+
+    # Apples at the far end of a ray, somewhere along it or anywhere free
+    free = [(x, y) for x in range(columns) for y in range(rows) if (x, y) not in cells]
+    step_x, step_y = rng.choice(SENSOR_STEPS)
+    ray = [(head[0] + k * step_x, head[1] + k * step_y) for k in range(1, max(columns, rows))]
+    ray = [cell for cell in ray if occupancy.on_board(*cell) and cell not in cells]
+    choice = rng.random()
+    if ray and choice < 0.3:
+        apple = ray[-1]
+    elif ray and choice < 0.6:
+        apple = rng.choice(ray)
+    else:
+        apple = rng.choice(free)
+    game.apple = Entity(apple[0] * SIZE, apple[1] * SIZE, SIZE, (255, 0, 0))
+    return (head[0] * SIZE, head[1] * SIZE)
+
+@pytest.mark.parametrize("width, height", BOARDS)
+def test_line_bounds_match_pygame(width, height):
+    sensors = RaySensors(width, height, SIZE, tables=False)
+    surface = pygame.Surface((width, height))
+    rng = random.Random(0)
+
+    for _ in range(5000):
+        start = (rng.randrange(-50, width + 50), rng.randrange(-50, height + 50))
+        end = (start[0] + rng.uniform(-1.2, 1.2) * width, start[1] + rng.uniform(-1.2, 1.2) * height)
+        if rng.random() < 0.5:
+            # Ends just short of or on a pixel, where truncation decides
+            end = (round(end[0]) - rng.choice([0, 1e-12]), round(end[1]) + rng.choice([0, 1e-12, -1e-12]))
+        rect = pygame.draw.line(surface, (255, 255, 255), start, end, 1)
+        assert sensors.line_bounds(start, end) == (tuple(rect) if rect.width else None), (start, end)
+
+@pytest.mark.parametrize("width, height", BOARDS)
+def test_sensor_data_matches_pygame(width, height):
+    game = Simulation(width, height, Entity(200, 200, SIZE, (0, 255, 0)), (255, 255, 255), seed=0)
+    rays = RaySensors(width, height, SIZE, tables=False)
+    rng = random.Random(width)
+
+    for _ in range(400):
+        point = random_state(game, rng)
+        expected = pygame_sensor_data(game, point)
+        assert game.line_sensor_data(point) == expected
+        assert game.sensor_data(point) == expected
+        assert rays.sensor_data(game.occupancy, point, game.apple.position()) == expected
+
+@pytest.mark.parametrize("width, height", [(420, 420), (300, 200)])
+def test_table_matches_rays_on_every_cell(width, height):
+    game = Simulation(width, height, Entity(200, 100, SIZE, (0, 255, 0)), (255, 255, 255), seed=0)
+    table = RaySensors(width, height, SIZE)
+    rays = RaySensors(width, height, SIZE, tables=False)
+    rng = random.Random(height)
+
+    for row in range(height // SIZE):
+        for column in range(width // SIZE):
+            for _ in range(3):
+                random_state(game, rng)
+
+                # Move the head onto this cell, keeping the body where it is
+                head = game.occupancy.index(column, row)
+                cells = [cell for cell in game.snake.cells if cell != head]
+                game.snake.restore([head] + cells[1:], None)
+                point = (column * SIZE, row * SIZE)
+
+                apple = game.apple.position()
+                expected = rays.sensor_data(game.occupancy, point, apple)
+                assert table.sensor_data(game.occupancy, point, apple) == expected, (column, row)
+                assert expected == pygame_sensor_data(game, point)